@@ -0,0 +1,61 @@
+import json
+
+
+class AppSettings:
+    """ Process-wide cache of config.txt and localization.json. Files are read once and shared by all widgets """
+    def __init__(self, config_file: str = "config.txt", localization_file: str = "localization.json"):
+        self.config_file = config_file
+        self.localization_file = localization_file
+        self.config = None  # {key: value} from the config file
+        self.lang = None  # language of the running app, a new language is applied after reboot
+        self.localization = None  # all languages from the localization file
+
+    def load_config(self) -> dict:
+        """ Reads 'key = value' lines of the config file, creates a default config if the file is broken """
+        if self.config is None:
+            try:
+                with open(self.config_file, "r") as config_file:
+                    self.config = dict(line.strip().split(" = ", 1) for line in config_file if " = " in line)
+                if "lang" not in self.config:
+                    raise ValueError("no language in the config")
+            except Exception as error:
+                print("Config.txt file error: ", error)
+                self.config = {"lang": "EN"}
+                self.save_config()
+            self.lang = self.config["lang"]
+        return self.config
+
+    def save_config(self) -> None:
+        """ Rewrites the config file with cached values """
+        with open(self.config_file, "w") as config_file:
+            print("\n".join(f"{key} = {value}" for key, value in self.config.items()), end="", file=config_file)
+
+    def get(self, key: str, default: str = "") -> str:
+        """ Returns a config value """
+        return self.load_config().get(key, default)
+
+    def get_lang(self) -> str:
+        self.load_config()
+        return self.lang
+
+    def load_localization(self) -> dict:
+        """ Parses the localization file once, raises FileNotFoundError if there is no file """
+        if self.localization is None:
+            with open(self.localization_file, encoding="utf-8") as localization_file:
+                self.localization = json.load(localization_file)
+        return self.localization
+
+    def section(self, name: str) -> dict:
+        """ Returns localization of a part of the app ("MainWindow", "ModInfoWidget", "Errors/Notes") """
+        return self.load_localization()[self.get_lang()][name]
+
+    def switch_language(self, lang: str) -> bool:
+        """ Writes chosen language in the config file. Returns False if it is already chosen """
+        if self.get("lang") == lang:
+            return False
+        self.config["lang"] = lang
+        self.save_config()
+        return True
+
+
+SETTINGS = AppSettings()
@@ -0,0 +1,55 @@
+""" Layouts (.ui files) are compiled into python modules once and imported on the next launches. A module is
+    rebuilt when the content of its .ui file changes, so editing the layout in Qt Designer needs no extra step """
+import hashlib
+import importlib.util
+import io
+from os import makedirs, path, replace
+
+UI_CACHE_FOLDER = "ui_generated"  # compiled layouts, it isn't a part of the repository
+
+
+def source_stamp(ui_file: str) -> str:
+    """ First line of the compiled module, it tells which .ui content the module was compiled from """
+    with open(ui_file, "rb") as source:
+        return f"# Compiled from {path.basename(ui_file)}, blake2b {hashlib.blake2b(source.read(), digest_size=16).hexdigest()}\n"
+
+
+def compile_ui(ui_file: str, stamp: str) -> str:
+    """ Returns the code of the module with the Ui_<form name> class. uic is imported only here, the launches that
+        use a compiled module don't need it """
+    from PyQt5 import uic
+    code = io.StringIO()
+    code.write(stamp)
+    uic.compileUi(ui_file, code)
+    return code.getvalue()
+
+
+def load_ui_class(ui_file: str, class_name: str = "Ui_MainWindow") -> type:
+    """ Returns the form class of the layout (its setupUi(window) creates the widgets), compiles the layout
+        if there is no module for its current content. Raises OSError if there is no .ui file """
+    stamp = source_stamp(ui_file)
+    module_name = path.splitext(path.basename(ui_file))[0] + "_ui"
+    module_path = path.join(UI_CACHE_FOLDER, module_name + ".py")
+    try:
+        with open(module_path, encoding="utf-8") as module_file:
+            is_compiled = module_file.readline() == stamp
+    except OSError:
+        is_compiled = False
+
+    if not is_compiled:
+        code = compile_ui(ui_file, stamp)
+        try:
+            makedirs(UI_CACHE_FOLDER, exist_ok=True)
+            with open(module_path + ".tmp", "w", encoding="utf-8") as module_file:
+                module_file.write(code)
+            replace(module_path + ".tmp", module_path)  # another launch never sees a half-written module
+        except OSError as error:  # e.g. read-only app folder, the layout is compiled on every launch then
+            print("UI cache error: ", error)
+            namespace = {"__name__": module_name}
+            exec(compile(code, ui_file, "exec"), namespace)
+            return namespace[class_name]
+
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # python caches its bytecode in __pycache__ as for any module
+    return getattr(module, class_name)
@@ -0,0 +1,149 @@
+""" Index of the files that mods of a game provide: relative path → mods that have it. Two mods with the same file
+    conflict, the game uses the file of the mod that is loaded later. Every path is kept once in a path table, a mod
+    keeps its files as an array of 4-byte path ids, so hundreds of thousands of files take a few tens of MB.
+    A mod is re-indexed alone when its folder changes, only its paths are touched """
+from array import array
+from os import scandir
+from typing import NamedTuple
+
+
+class Conflict(NamedTuple):
+    """ A file that several mods provide """
+    path: str
+    winner: object  # the mod loaded last, its file is used
+    overridden: list  # mods whose file isn't used, in load order
+
+
+def game_files(folder: str) -> list:
+    """ Relative paths ('common/on_actions/00_on_actions.txt') of the files that the game loads from the mod folder.
+        Files at the top of the folder (descriptor, thumbnail, readme) aren't game files and are skipped.
+        Links to folders aren't followed. Raises OSError if the folder can't be read """
+    files = []
+    stack = []
+    with scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append((entry.path, entry.name + "/"))
+    while stack:
+        current, prefix = stack.pop()
+        with scandir(current) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, prefix + entry.name + "/"))
+                else:
+                    files.append(prefix + entry.name)
+    return files
+
+
+class ConflictIndex:
+    """ Inverted index of a game: file path → mods. Paths are compared case-insensitively (as on Windows).
+        A path that has more than one mod is a conflict, the set of them is kept up to date by set_files()/remove() """
+    def __init__(self):
+        self.path_ids = {}  # path key (lower case): id
+        self.paths = []  # id: path as it is written by the first mod with it
+        self.holders = []  # id: None, the mod with the file or a list of mods if several have it
+        self.files_of = {}  # mod: (folder it was indexed from, array of path ids)
+        self.conflicted = set()  # ids of the paths that several mods have
+
+    def path_id(self, path: str) -> int:
+        """ Id of the path in the path table, it is added if it isn't there. Paths without mods keep their id
+            (the mod may get the file back), the table only grows with the paths that mods have ever had """
+        key = path.lower()
+        path_id = self.path_ids.get(key)
+        if path_id is None:
+            path_id = self.path_ids[key if key != path else path] = len(self.paths)  # one string if it's lower case
+            self.paths.append(path)
+            self.holders.append(None)
+        return path_id
+
+    def set_files(self, mod, folder: str, paths: list) -> bool:
+        """ Indexes the files of the mod or re-indexes them, only added and removed files are changed.
+            Returns False if the files are the same as before """
+        new_ids = array("I", sorted({self.path_id(path) for path in paths}))
+        indexed = self.files_of.get(mod)
+        old_ids = indexed[1] if indexed is not None else array("I")
+        self.files_of[mod] = (folder, new_ids)
+        if new_ids == old_ids:
+            return False
+        if old_ids:
+            kept = set(new_ids)
+            for path_id in old_ids:
+                if path_id not in kept:
+                    self.remove_holder(path_id, mod)
+            old = set(old_ids)
+            added = [path_id for path_id in new_ids if path_id not in old]
+        else:
+            added = new_ids
+        for path_id in added:
+            self.add_holder(path_id, mod)
+        return True
+
+    def remove(self, mod) -> None:
+        indexed = self.files_of.pop(mod, None)
+        if indexed is None:
+            return
+        for path_id in indexed[1]:
+            self.remove_holder(path_id, mod)
+
+    def clear(self) -> None:
+        self.path_ids.clear()
+        self.paths.clear()
+        self.holders.clear()
+        self.files_of.clear()
+        self.conflicted.clear()
+
+    def add_holder(self, path_id: int, mod) -> None:
+        holders = self.holders[path_id]
+        if holders is None:
+            self.holders[path_id] = mod
+        elif type(holders) is list:
+            holders.append(mod)
+        else:
+            self.holders[path_id] = [holders, mod]
+            self.conflicted.add(path_id)
+
+    def remove_holder(self, path_id: int, mod) -> None:
+        holders = self.holders[path_id]
+        if type(holders) is not list:
+            self.holders[path_id] = None
+            return
+        holders.remove(mod)
+        if len(holders) == 1:
+            self.holders[path_id] = holders[0]
+            self.conflicted.discard(path_id)
+
+    def indexed_folder(self, mod) -> str:
+        """ Folder the mod's files were indexed from, '' if the mod isn't indexed """
+        indexed = self.files_of.get(mod)
+        return indexed[0] if indexed is not None else ""
+
+    def file_count(self, mod=None) -> int:
+        """ Files of the mod, of all mods if it isn't given """
+        if mod is not None:
+            indexed = self.files_of.get(mod)
+            return len(indexed[1]) if indexed is not None else 0
+        return sum(len(path_ids) for _, path_ids in self.files_of.values())
+
+    def conflicts(self, rank: dict, mod=None) -> list:
+        """ Returns Conflicts sorted by path, only the ones of the mod if it is given.
+            rank is {mod: position in the load order}, a mod with a higher position overrides the lower ones """
+        if mod is None:
+            path_ids = self.conflicted
+        else:
+            indexed = self.files_of.get(mod)
+            path_ids = [path_id for path_id in indexed[1] if path_id in self.conflicted] if indexed is not None else ()
+        found = []
+        for path_id in path_ids:
+            mods = sorted(self.holders[path_id], key=rank.__getitem__)
+            found.append(Conflict(self.paths[path_id], mods[-1], mods[:-1]))
+        found.sort(key=lambda conflict: conflict.path)
+        return found
+
+    def overrides(self, rank: dict, mod=None) -> dict:
+        """ Returns {(winner, overridden mod): number of files} of all conflicts (or of the mod's ones) """
+        pairs = {}
+        for conflict in self.conflicts(rank, mod):
+            for overridden in conflict.overridden:
+                pair = (conflict.winner, overridden)
+                pairs[pair] = pairs.get(pair, 0) + 1
+        return pairs
@@ -0,0 +1,394 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from os import listdir, path
+from typing import Iterator
+from GameVersion import version_low, version_high
+from TagIndex import query_sql, tag_key
+from Tracing import TRACER
+
+# ↓ connection settings: WAL lets worker threads read while the GUI writes, commits don't wait for fsync
+PRAGMAS = ("PRAGMA journal_mode = WAL",
+           "PRAGMA synchronous = NORMAL",
+           "PRAGMA temp_store = MEMORY",
+           "PRAGMA cache_size = -8000")  # 8 MB
+STATEMENT_CACHE_SIZE = 256  # compiled statements kept by every connection
+POOL_SIZE = 4  # idle connections kept for worker threads
+BUSY_TIMEOUT = 10  # seconds to wait for a lock held by another connection
+DATABASE_EXTENSIONS = (".db", ".sqlite", ".db3", ".sqlite3", ".s3db", ".sl3")
+
+# ↓ SQL queries of the app. The same text is used everywhere, so sqlite3 reuses the compiled statement
+SELECT_GAMES = """SELECT * FROM Games"""
+INSERT_GAME = """INSERT INTO Games(Game_title) VALUES(?)"""
+UPDATE_GAME_TITLE = """UPDATE Games SET Game_title = ? WHERE Game_title = ?"""
+DELETE_GAME = """DELETE FROM Games WHERE Game_title = ?"""
+SELECT_GAME_MODS = """SELECT * FROM Mods WHERE Game_ID = ?"""
+INSERT_MOD = """INSERT INTO Mods(Game_ID, Title, Tags, Mversion, Gversion, Requirements, Filepath, Incompatible, Commentary, IMG_Path,
+                                 Gversion_Low, Gversion_High, Fingerprint)
+                VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+UPDATE_MOD = """UPDATE Mods
+                SET Title = ?, Tags = ?, Mversion = ?, Gversion = ?, Requirements = ?, Filepath = ?, Incompatible = ?,
+                    Commentary = ?, IMG_Path = ?, Gversion_Low = ?, Gversion_High = ?, Fingerprint = ?
+                WHERE Mod_ID = ?"""
+DELETE_MOD = """DELETE FROM Mods WHERE Mod_ID = ? AND Game_ID = ?"""
+DELETE_GAME_MODS = """DELETE FROM Mods WHERE Game_ID = ?"""
+DELETE_MOD_TAGS = """DELETE FROM ModTags WHERE Mod_ID = ?"""
+INSERT_MOD_TAG = """INSERT OR IGNORE INTO ModTags(Mod_ID, Tag) VALUES(?, ?)"""
+SELECT_TAGGED_MODS = """SELECT Mod_ID FROM Mods WHERE Game_ID = ? AND {}"""  # condition of TagIndex.query_sql
+SEARCH_MODS = """SELECT Mods.Mod_ID, Mods.Game_ID FROM ModsSearch JOIN Mods ON Mods.Mod_ID = ModsSearch.rowid
+                 WHERE ModsSearch MATCH ? ORDER BY bm25(ModsSearch, 10.0, 5.0, 1.0) LIMIT ?"""
+# ↓ all mods with the title of their game (one game if :game is its title or id), the order of the games and of the mods in them
+SELECT_EXPORT_MODS = """SELECT Mods.Mod_ID, Mods.Game_ID, Games.Game_title, Title, Tags, Mversion, Gversion, Requirements,
+                               Filepath, Incompatible, Commentary, IMG_Path
+                        FROM Mods JOIN Games ON Games.Game_ID = Mods.Game_ID
+                        WHERE :game = '' OR Games.Game_title = :game OR CAST(Games.Game_ID AS TEXT) = :game
+                        ORDER BY Mods.Game_ID, Mods.Mod_ID"""
+# ↓ mods of the game whose supported versions overlap the (low, high) key range (see GameVersion.version_range), newest first
+SELECT_COMPATIBLE_MODS = """SELECT Mod_ID FROM Mods WHERE Game_ID = ? AND Gversion_Low < ? AND Gversion_High > ?
+                            ORDER BY Gversion_Low DESC, Gversion_High DESC"""
+# ↓ state of every file of a mod when it was hashed (see ModFingerprint.py)
+SELECT_MOD_FILES = """SELECT Path, Mtime_NS, Size, Hash FROM ModFiles WHERE Mod_ID = ?"""
+DELETE_MOD_FILES = """DELETE FROM ModFiles WHERE Mod_ID = ?"""
+INSERT_MOD_FILE = """INSERT INTO ModFiles(Mod_ID, Path, Mtime_NS, Size, Hash) VALUES(?, ?, ?, ?, ?)"""
+# ↓ the first fingerprint of a saved mod is its fingerprint at the last save, later ones are written only by saving the mod
+SET_FIRST_FINGERPRINT = """UPDATE Mods SET Fingerprint = ? WHERE Mod_ID = ? AND Fingerprint IS NULL"""
+
+# ↓ full-text index of a new mod, bulk_insert replaces it by one INDEX_NEW_MODS statement
+CREATE_SEARCH_INSERT_TRIGGER = """ CREATE TRIGGER IF NOT EXISTS "Mods_Search_Insert" AFTER INSERT ON "Mods"
+         BEGIN
+             INSERT INTO ModsSearch(rowid, Title, Tags, Commentary) VALUES (new.Mod_ID, new.Title, new.Tags, new.Commentary);
+         END """
+DROP_SEARCH_INSERT_TRIGGER = """ DROP TRIGGER IF EXISTS "Mods_Search_Insert" """
+INDEX_NEW_MODS = """INSERT INTO ModsSearch(rowid, Title, Tags, Commentary) SELECT Mod_ID, Title, Tags, Commentary FROM Mods
+                    WHERE Mod_ID > ?"""
+SELECT_LAST_MOD_ID = """SELECT COALESCE(MAX(Mod_ID), 0) FROM Mods"""
+
+# ↓ schema changes, MIGRATIONS[n] upgrades a database from user_version n to n + 1. Never edit applied migrations, add new ones
+MIGRATIONS = (
+    # 1: tables of the first app versions (databases created by them already have these tables)
+    (""" CREATE TABLE IF NOT EXISTS "Games" (
+             "Game_ID"	INTEGER,
+             "Game_title"	TEXT,
+             PRIMARY KEY("Game_ID" AUTOINCREMENT)
+         ) """,
+     """ CREATE TABLE IF NOT EXISTS "Mods" (
+             "Mod_ID"	INTEGER,
+             "Game_ID"	INTEGER,
+             "Title"	TEXT,
+             "Tags"	TEXT,
+             "Mversion"	TEXT,
+             "Gversion"	TEXT,
+             "Requirements"	NUMERIC,
+             "Filepath"	TEXT,
+             "Incompatible"	TEXT,
+             "Commentary"	TEXT,
+             "IMG_Path"	TEXT,
+             PRIMARY KEY("Mod_ID" AUTOINCREMENT)
+         ) """),
+    # 2: indexes; (Game_ID, Title, Filepath) is the mod key, old duplicates get their id in the title instead of being lost
+    (""" UPDATE Mods SET Title = Title || ' (' || Mod_ID || ')'
+         WHERE Mod_ID NOT IN (SELECT MIN(Mod_ID) FROM Mods GROUP BY Game_ID, Title, Filepath) """,
+     """ CREATE UNIQUE INDEX IF NOT EXISTS "Mods_Key" ON "Mods" ("Game_ID", "Title", "Filepath") """,
+     """ CREATE INDEX IF NOT EXISTS "Games_Title" ON "Games" ("Game_title") """),
+    # 3: tags of every mod as rows (Mods.Tags stays the comma-joined text shown to the user), filled from Mods.Tags
+    (""" CREATE TABLE IF NOT EXISTS "ModTags" (
+             "Mod_ID"	INTEGER NOT NULL,
+             "Tag"	TEXT NOT NULL,
+             PRIMARY KEY("Mod_ID", "Tag")
+         ) WITHOUT ROWID """,
+     """ CREATE INDEX IF NOT EXISTS "ModTags_Tag" ON "ModTags" ("Tag" COLLATE NOCASE) """,
+     """ CREATE TRIGGER IF NOT EXISTS "Mods_Delete_Tags" AFTER DELETE ON "Mods"
+         BEGIN
+             DELETE FROM ModTags WHERE Mod_ID = old.Mod_ID;
+         END """,
+     """ WITH RECURSIVE split(Mod_ID, Tag, Rest) AS (
+             SELECT Mod_ID, '', COALESCE(Tags, '') || ',' FROM Mods
+             UNION ALL
+             SELECT Mod_ID, TRIM(SUBSTR(Rest, 1, INSTR(Rest, ',') - 1)), SUBSTR(Rest, INSTR(Rest, ',') + 1)
+             FROM split WHERE Rest <> ''
+         )
+         INSERT OR IGNORE INTO ModTags(Mod_ID, Tag) SELECT Mod_ID, Tag FROM split WHERE Tag <> '' """),
+    # 4: full-text index of title, tags and commentary (FTS5 external content table), triggers keep it in sync with Mods
+    (""" CREATE VIRTUAL TABLE IF NOT EXISTS "ModsSearch" USING fts5(
+             Title, Tags, Commentary, content='Mods', content_rowid='Mod_ID',
+             tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+         ) """,
+     CREATE_SEARCH_INSERT_TRIGGER,
+     """ CREATE TRIGGER IF NOT EXISTS "Mods_Search_Delete" AFTER DELETE ON "Mods"
+         BEGIN
+             INSERT INTO ModsSearch(ModsSearch, rowid, Title, Tags, Commentary)
+             VALUES ('delete', old.Mod_ID, old.Title, old.Tags, old.Commentary);
+         END """,
+     """ CREATE TRIGGER IF NOT EXISTS "Mods_Search_Update" AFTER UPDATE OF Title, Tags, Commentary ON "Mods"
+         BEGIN
+             INSERT INTO ModsSearch(ModsSearch, rowid, Title, Tags, Commentary)
+             VALUES ('delete', old.Mod_ID, old.Title, old.Tags, old.Commentary);
+             INSERT INTO ModsSearch(rowid, Title, Tags, Commentary) VALUES (new.Mod_ID, new.Title, new.Tags, new.Commentary);
+         END """,
+     """ INSERT INTO ModsSearch(ModsSearch) VALUES ('rebuild') """),
+    # 5: supported game version as a range of sortable keys (GameVersion.py), NULL if Gversion isn't a version
+    (""" ALTER TABLE "Mods" ADD COLUMN "Gversion_Low" TEXT """,
+     """ ALTER TABLE "Mods" ADD COLUMN "Gversion_High" TEXT """,
+     """ UPDATE Mods SET Gversion_Low = version_low(Gversion), Gversion_High = version_high(Gversion) """,
+     """ CREATE INDEX IF NOT EXISTS "Mods_Gversion" ON "Mods" ("Game_ID", "Gversion_Low", "Gversion_High") """),
+    # 6: content fingerprint of the mod files when the mod was saved, the files as they were hashed the last time
+    (""" ALTER TABLE "Mods" ADD COLUMN "Fingerprint" TEXT """,
+     """ CREATE TABLE IF NOT EXISTS "ModFiles" (
+             "Mod_ID"	INTEGER NOT NULL,
+             "Path"	TEXT NOT NULL,
+             "Mtime_NS"	INTEGER NOT NULL,
+             "Size"	INTEGER NOT NULL,
+             "Hash"	TEXT NOT NULL,
+             PRIMARY KEY("Mod_ID", "Path")
+         ) WITHOUT ROWID """,
+     """ CREATE TRIGGER IF NOT EXISTS "Mods_Delete_Files" AFTER DELETE ON "Mods"
+         BEGIN
+             DELETE FROM ModFiles WHERE Mod_ID = old.Mod_ID;
+         END """),
+    # 7: ModTags keeps tags casefolded (TagIndex.tag_key), NOCASE folds only ASCII letters. Tags that become the same
+    #    are kept once
+    (""" UPDATE OR IGNORE ModTags SET Tag = tag_key(Tag) WHERE Tag <> tag_key(Tag) """,
+     """ DELETE FROM ModTags WHERE Tag <> tag_key(Tag) """,
+     """ DROP INDEX IF EXISTS "ModTags_Tag" """,
+     """ CREATE INDEX IF NOT EXISTS "ModTags_Tag" ON "ModTags" ("Tag") """),
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+REQUIRED_COLUMNS = {"Games": {"Game_ID", "Game_title"},  # columns the app reads from a database of any version
+                    "Mods": {"Mod_ID", "Game_ID", "Title", "Tags", "Mversion", "Gversion", "Requirements", "Filepath",
+                             "Incompatible", "Commentary", "IMG_Path"}}
+
+
+def schema_version(con: sqlite3.Connection) -> int:
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(con: sqlite3.Connection) -> int:
+    """ Upgrades the database in place to SCHEMA_VERSION, every migration is a transaction of its own.
+        Returns the number of applied migrations, raises sqlite3.Error """
+    version = schema_version(con)
+    for migration_version in range(version, SCHEMA_VERSION):
+        con.execute("BEGIN IMMEDIATE")  # DDL doesn't start a transaction by itself
+        try:
+            for statement in MIGRATIONS[migration_version]:
+                con.execute(statement)
+            con.execute(f"PRAGMA user_version = {migration_version + 1}")
+            con.commit()
+        except sqlite3.Error:
+            con.rollback()
+            raise
+    return SCHEMA_VERSION - version
+
+
+def is_app_database(database_name: str) -> bool:
+    """ Checks if the file is a database of any version of the app (it may need migrations) """
+    con = None
+    try:
+        con = sqlite3.connect(f"file:{database_name}?mode=ro", uri=True)  # a foreign file must stay as it is
+        if schema_version(con) > SCHEMA_VERSION:
+            print(f"{database_name} is made by a newer version of the app")
+            return False
+        for table, columns in REQUIRED_COLUMNS.items():
+            if not columns <= {column[1] for column in con.execute(f"PRAGMA table_info({table})")}:
+                return False
+        return True
+    except sqlite3.Error as error:
+        print(error)
+        return False
+    finally:
+        if con is not None:
+            con.close()
+
+
+def find_database(folder: str = ".") -> str:
+    """ Returns path of the first app database in the folder, '' if there is none """
+    for file in sorted(listdir(folder)):
+        if file.endswith(DATABASE_EXTENSIONS) and is_app_database(path.join(folder, file)):
+            return path.join(folder, file) if folder != "." else file
+    return ""
+
+
+def statement_name(sql: str) -> str:
+    """ Span name of the statement: its text on one line, shortened """
+    return " ".join(sql.split())[:80]
+
+
+class TracedConnection(sqlite3.Connection):
+    """ Connection whose statements are recorded as spans, it is used only if tracing is on (see Tracing.py).
+        A span of a SELECT is the time to the first row, fetching the rest is in the span of the caller """
+    def execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        with TRACER.span(statement_name(sql), "sqlite"):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql: str, parameters) -> sqlite3.Cursor:
+        parameters = parameters if isinstance(parameters, list) else list(parameters)
+        with TRACER.span(statement_name(sql), "sqlite", rows=len(parameters)):
+            return super().executemany(sql, parameters)
+
+    def commit(self) -> None:
+        with TRACER.span("COMMIT", "sqlite"):
+            super().commit()
+
+
+class Database:
+    """ Data access of one database file. The GUI thread uses one long-lived connection,
+        worker threads borrow connections from a small pool (a sqlite3 connection can't be used by two threads at once) """
+    def __init__(self, database_name: str):
+        self.database_name = database_name
+        self.main_connection = None  # connection of the thread that used the database first (GUI thread)
+        self.main_thread = None
+        self.pool = []  # idle connections for worker threads
+        self.lock = threading.Lock()
+
+    def open_connection(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        """ Opens a configured connection, raises sqlite3.Error """
+        con = sqlite3.connect(self.database_name, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE,
+                              check_same_thread=check_same_thread,
+                              factory=TracedConnection if TRACER.enabled else sqlite3.Connection)
+        for pragma in PRAGMAS:
+            con.execute(pragma)
+        con.create_function("version_low", 1, version_low, deterministic=True)  # used by the migrations
+        con.create_function("version_high", 1, version_high, deterministic=True)
+        con.create_function("tag_key", 1, tag_key, deterministic=True)
+        return con
+
+    def connection(self) -> sqlite3.Connection:
+        """ Returns the long-lived connection. It must be used only by the thread that has opened it.
+            The database is upgraded to the current schema when the connection is opened """
+        if self.main_connection is None:
+            con = self.open_connection()
+            try:
+                migrate(con)
+            except sqlite3.Error:
+                con.close()
+                raise
+            self.main_connection = con
+            self.main_thread = threading.get_ident()
+        return self.main_connection
+
+    @contextmanager
+    def worker_connection(self) -> Iterator[sqlite3.Connection]:
+        """ Borrows a connection for a worker thread, it goes back to the pool after the 'with' block """
+        with self.lock:
+            con = self.pool.pop() if self.pool else None
+        if con is None:
+            con = self.open_connection(check_same_thread=False)  # it is passed between worker threads
+        try:
+            yield con
+        finally:
+            if con.in_transaction:
+                con.rollback()
+            with self.lock:
+                if len(self.pool) < POOL_SIZE:
+                    self.pool.append(con)
+                    con = None
+            if con is not None:
+                con.close()
+
+    def close(self) -> None:
+        """ Closes all connections (when the app is closed) """
+        with self.lock:
+            pool, self.pool = self.pool, []
+        for con in pool:
+            con.close()
+        if self.main_connection is not None:
+            self.main_connection.close()
+            self.main_connection = None
+
+
+def execute_batch(con: sqlite3.Connection, sql: str, rows: list) -> list:
+    """ Runs executemany inside the current transaction (it is started if needed). If a row breaks a constraint the batch is undone
+        and rows are run one by one. Returns indexes of the rows that failed """
+    if not con.in_transaction:
+        con.execute("BEGIN")  # a savepoint outside of a transaction would commit on release
+    con.execute("SAVEPOINT batch")
+    try:
+        con.executemany(sql, rows)
+        return []
+    except sqlite3.IntegrityError:
+        con.execute("ROLLBACK TO batch")
+        failed = []
+        for index, row in enumerate(rows):
+            try:
+                con.execute(sql, row)
+            except sqlite3.IntegrityError as error:
+                print(error)
+                failed.append(index)
+        return failed
+    finally:
+        con.execute("RELEASE batch")
+
+
+@contextmanager
+def bulk_insert(con: sqlite3.Connection) -> Iterator[None]:
+    """ Mods inserted in the block are added to the full-text index by one statement at the end instead of the trigger
+        on every row (4 times faster for thousands of rows). The block is a part of the current transaction
+        (it is started if needed), the caller rolls it back on an error and the trigger comes back with it """
+    if not con.in_transaction:
+        con.execute("BEGIN")  # DDL doesn't start a transaction by itself
+    last_mod_id = con.execute(SELECT_LAST_MOD_ID).fetchone()[0]  # ids of AUTOINCREMENT only grow
+    con.execute(DROP_SEARCH_INSERT_TRIGGER)
+    yield
+    con.execute(INDEX_NEW_MODS, (last_mod_id,))
+    con.execute(CREATE_SEARCH_INSERT_TRIGGER)
+
+
+def write_tags(con: sqlite3.Connection, mod_tags: list) -> None:
+    """ Replaces ModTags rows of the mods inside the current transaction. mod_tags is [(mod id, [tag])],
+        the rows keep the tags casefolded (TagIndex.tag_key) """
+    con.executemany(DELETE_MOD_TAGS, [(mod_id,) for mod_id, _ in mod_tags])
+    con.executemany(INSERT_MOD_TAG, [(mod_id, tag_key(tag)) for mod_id, tags in mod_tags for tag in tags])
+
+
+def read_mod_files(con: sqlite3.Connection, mod_id: int) -> dict:
+    """ Returns {relative path: (mtime_ns, size, hash)} of the mod's files when they were hashed the last time """
+    return {row[0]: row[1:] for row in con.execute(SELECT_MOD_FILES, (mod_id,))}
+
+
+def write_mod_files(con: sqlite3.Connection, mod_files: list) -> None:
+    """ Replaces ModFiles rows of the mods inside the current transaction. mod_files is [(mod id, {path: (mtime_ns, size, hash)})] """
+    con.executemany(DELETE_MOD_FILES, [(mod_id,) for mod_id, _ in mod_files])
+    con.executemany(INSERT_MOD_FILE, [(mod_id, file_path, *state) for mod_id, files in mod_files
+                                      for file_path, state in files.items()])
+
+
+def search_tags(con: sqlite3.Connection, game_id: int, query: str) -> list:
+    """ Returns Mod_IDs of the game's saved mods that match the tag query (see TagIndex.parse_query), they are found
+        through the ModTags table without loading the mods. Raises TagIndex.TagQueryError """
+    condition, parameters = query_sql(query)
+    if not condition:
+        return []
+    return [row[0] for row in con.execute(SELECT_TAGGED_MODS.format(condition), (game_id, *parameters))]
+
+
+def search_query(text: str) -> str:
+    """ Makes a FTS5 query from the text of the search box: every word is a prefix, all words must match """
+    words = [word.replace('"', '""') for word in text.split()]
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_mods(con: sqlite3.Connection, text: str, limit: int = 10000) -> list:
+    """ Returns [(Mod_ID, Game_ID)] of the mods of all games that match the text, the best matches first
+        (a match in the title weighs more than in the tags, tags more than commentary) """
+    query = search_query(text)
+    return con.execute(SEARCH_MODS, (query, limit)).fetchall() if query else []
+
+
+DATABASES = {}  # database name: Database, one instance per file for the whole app
+DATABASES_LOCK = threading.Lock()
+
+
+def get_database(database_name: str) -> Database:
+    """ Returns the shared data access object of the database file """
+    with DATABASES_LOCK:
+        database = DATABASES.get(database_name)
+        if database is None:
+            database = DATABASES[database_name] = Database(database_name)
+        return database
+
+
+def close_databases() -> None:
+    with DATABASES_LOCK:
+        databases = list(DATABASES.values())
+        DATABASES.clear()
+    for database in databases:
+        database.close()
@@ -0,0 +1,190 @@
+import heapq
+from collections import deque
+
+
+def title_key(title: str) -> str:
+    """ Mods refer to each other by title, titles are compared case-insensitively """
+    return title.strip().casefold()
+
+
+def split_titles(titles: str) -> list:
+    """ Keys of the comma-joined titles (required_mods, incompatible_mods) """
+    return [key for key in (title_key(title) for title in (titles or "").split(",")) if key]
+
+
+class DependencyGraph:
+    """ Graph of a game's mods built from required_mods and incompatible_mods. A node is a mod title (key), several
+        mods may have the same title. Adjacency and reverse adjacency are kept up to date by add()/remove(),
+        only the nodes of the changed mod are touched """
+    def __init__(self):
+        self.mods_by_key = {}  # title key: {mod}
+        self.titles = {}  # title key: title as it is written by the first mod with it
+        self.required_titles = {}  # title key: title as it is written in relations (for missing mods)
+        self.edges_of = {}  # mod: (title key, required keys, incompatible keys) the mod was added with
+        self.requires = {}  # title key: {title keys it requires}
+        self.required_by = {}  # reverse of requires
+        self.incompatible = {}  # title key: {title keys}, both directions (a mod may declare it on either side)
+        self.closures = {}  # title key: transitive requirements, cleared on every change
+
+    def add(self, mod) -> None:
+        """ Adds the mod or updates its edges if its title or relations have changed """
+        edges = (title_key(mod.title), frozenset(split_titles(mod.required_mods)),
+                 frozenset(split_titles(mod.incompatible_mods)))
+        if self.edges_of.get(mod) == edges:
+            return
+        self.remove(mod)
+        key = edges[0]
+        self.edges_of[mod] = edges
+        self.mods_by_key.setdefault(key, set()).add(mod)
+        self.titles.setdefault(key, mod.title.strip())
+        for title in f"{mod.required_mods},{mod.incompatible_mods}".split(","):
+            if title.strip():
+                self.required_titles.setdefault(title_key(title), title.strip())
+        self.rebuild_node(key)
+
+    def remove(self, mod) -> None:
+        edges = self.edges_of.pop(mod, None)
+        if edges is None:
+            return
+        key = edges[0]
+        self.mods_by_key[key].discard(mod)
+        if not self.mods_by_key[key]:
+            del self.mods_by_key[key]
+            del self.titles[key]
+        self.rebuild_node(key)
+
+    def rebuild_node(self, key: str) -> None:
+        """ Recomputes edges of the node from its mods and fixes the reverse adjacency of the changed edges """
+        mods = self.mods_by_key.get(key, ())
+        requires = set().union(*(self.edges_of[mod][1] for mod in mods))
+        declared_incompatible = set().union(*(self.edges_of[mod][2] for mod in mods))
+        old_requires = self.requires.pop(key, set())
+        for removed in old_requires - requires:
+            self.discard_edge(self.required_by, removed, key)
+        for added in requires - old_requires:
+            self.required_by.setdefault(added, set()).add(key)
+        if requires:
+            self.requires[key] = requires
+
+        for other in list(self.incompatible.get(key, ())):  # keep incompatibilities declared by the other side
+            if other not in declared_incompatible and not self.declares_incompatible(other, key):
+                self.discard_edge(self.incompatible, key, other)
+                self.discard_edge(self.incompatible, other, key)
+        for other in declared_incompatible:
+            self.incompatible.setdefault(key, set()).add(other)
+            self.incompatible.setdefault(other, set()).add(key)
+        self.closures.clear()
+
+    def declares_incompatible(self, key: str, other: str) -> bool:
+        return any(other in self.edges_of[mod][2] for mod in self.mods_by_key.get(key, ()))
+
+    @staticmethod
+    def discard_edge(adjacency: dict, key: str, other: str) -> None:
+        others = adjacency.get(key)
+        if others is not None:
+            others.discard(other)
+            if not others:
+                del adjacency[key]
+
+    def title(self, key: str) -> str:
+        return self.titles.get(key) or self.required_titles.get(key, key)
+
+    def requirements(self, title: str) -> set:
+        """ Transitive requirements of the mod (keys), the mod itself isn't included unless it is in a cycle """
+        key = title_key(title)
+        closure = self.closures.get(key)
+        if closure is None:
+            closure = self.closures[key] = self.reachable(self.requires, key)
+        return closure
+
+    def dependents(self, title: str) -> set:
+        """ Keys of all mods that need the mod directly or through other mods """
+        return self.reachable(self.required_by, title_key(title))
+
+    def incompatibilities(self, title: str) -> set:
+        return set(self.incompatible.get(title_key(title), ()))
+
+    @staticmethod
+    def reachable(adjacency: dict, key: str) -> set:
+        found = set()
+        queue = deque(adjacency.get(key, ()))
+        while queue:
+            node = queue.popleft()
+            if node not in found:
+                found.add(node)
+                queue.extend(adjacency.get(node, ()))
+        return found
+
+    def missing(self) -> dict:
+        """ Returns {mod key: required keys that aren't mods of the game} """
+        return {key: {required for required in requires if required not in self.mods_by_key}
+                for key, requires in self.requires.items()
+                if key in self.mods_by_key and not requires <= self.mods_by_key.keys()}
+
+    def cycles(self) -> list:
+        """ Groups of mods that require each other (strongly connected components, Tarjan's algorithm without recursion) """
+        index_of, low, on_stack, stack, cycles = {}, {}, set(), [], []
+        for root in self.mods_by_key:
+            if root in index_of:
+                continue
+            work = [(root, iter(sorted(self.requires.get(root, ()))))]
+            index_of[root] = low[root] = len(index_of)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in self.mods_by_key:  # missing mods aren't nodes of the graph
+                        continue
+                    if child not in index_of:
+                        index_of[child] = low[child] = len(index_of)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(sorted(self.requires.get(child, ())))))
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index_of[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index_of[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        if len(component) > 1 or node in self.requires.get(node, ()):
+                            cycles.append(sorted(component))
+        return cycles
+
+    def load_order(self, titles: list = None) -> tuple:
+        """ Returns (keys in load order, keys that can't be ordered because of cycles). Requirements come before the
+            mods that need them, otherwise mods are in alphabetical order. Only the given mods and their requirements
+            are ordered if titles are given, all mods otherwise. Missing mods are skipped """
+        if titles is None:
+            nodes = set(self.mods_by_key)
+        else:
+            nodes = set()
+            for title in titles:
+                key = title_key(title)
+                nodes.add(key)
+                nodes |= self.requirements(title)
+            nodes &= self.mods_by_key.keys()
+        waiting = {node: len(self.requires.get(node, set()) & nodes) for node in nodes}  # Kahn's algorithm
+        ready = [node for node, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            node = heapq.heappop(ready)
+            order.append(node)
+            for dependent in self.required_by.get(node, ()):
+                if dependent in waiting:
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        heapq.heappush(ready, dependent)
+        ordered = set(order)
+        return order, sorted(node for node in nodes if node not in ordered)
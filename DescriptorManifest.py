@@ -0,0 +1,95 @@
+import hashlib
+import json
+from os import path, replace, sep, stat
+from typing import NamedTuple, Optional
+
+
+class ManifestEntry(NamedTuple):
+    """ State of the descriptor file when the mod was updated from it the last time """
+    path: str
+    mtime_ns: int
+    size: int
+    hash: str
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def is_inside(file_path: str, folder: str) -> bool:
+    """ Checks if the file is in the folder or in its subfolders """
+    folder = path.normcase(path.normpath(folder)) if folder else ""
+    return bool(folder) and path.normcase(path.normpath(file_path)).startswith(folder.rstrip(sep) + sep)
+
+
+class DescriptorManifest:
+    """ Descriptor path, mtime, size and content hash of every saved mod (by Mod_ID), stored in a json file
+        next to the database. It lets 'update all' skip mods whose descriptor hasn't changed """
+    def __init__(self, manifest_file: str):
+        self.manifest_file = manifest_file
+        self.entries = None  # {mod id: ManifestEntry}
+        self.changed = False  # entries differ from the file
+
+    @classmethod
+    def for_database(cls, database_name: str) -> "DescriptorManifest":
+        return cls(path.splitext(database_name)[0] + ".manifest.json")
+
+    def load(self) -> dict:
+        """ Reads the manifest file once, a missing or broken file means an empty manifest """
+        if self.entries is None:
+            try:
+                with open(self.manifest_file, encoding="utf-8") as manifest_file:
+                    self.entries = {int(mod_id): ManifestEntry(*entry) for mod_id, entry in json.load(manifest_file).items()}
+            except FileNotFoundError:
+                self.entries = {}
+            except (OSError, ValueError, TypeError) as error:
+                print("Manifest file error: ", error)
+                self.entries = {}
+        return self.entries
+
+    def save(self) -> None:
+        """ Writes the manifest if it has changed. The file is replaced at once, so it is never half-written """
+        if not self.changed:
+            return
+        temp_path = self.manifest_file + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as manifest_file:
+                json.dump({mod_id: list(entry) for mod_id, entry in self.entries.items()}, manifest_file)
+            replace(temp_path, self.manifest_file)
+            self.changed = False
+        except OSError as error:
+            print("Manifest file error: ", error)
+
+    def known_descriptor(self, mod_id: Optional[int], folder: str) -> str:
+        """ Returns the descriptor the mod was updated from if it is in the mod folder and the file is still there,
+            '' otherwise (e.g. the folder of the mod has been edited since then) """
+        entry = self.load().get(mod_id)
+        if entry is None or not is_inside(entry.path, folder):
+            return ""
+        return entry.path if path.isfile(entry.path) else ""
+
+    def read_if_changed(self, mod_id: Optional[int], descriptor_file_path: str) -> tuple:
+        """ Returns (None, None) if the descriptor is the same as in the manifest, (text, new ManifestEntry) otherwise.
+            mtime and size are checked first, the file is read and hashed only if they differ.
+            The new entry is stored by remember() when the mod is updated. Raises OSError """
+        file_stat = stat(descriptor_file_path)
+        entry = self.load().get(mod_id)
+        if entry is not None and entry.path == descriptor_file_path and \
+                entry.mtime_ns == file_stat.st_mtime_ns and entry.size == file_stat.st_size:
+            return None, None
+        with open(descriptor_file_path, "rb") as descriptor_file:
+            data = descriptor_file.read()
+        new_entry = ManifestEntry(descriptor_file_path, file_stat.st_mtime_ns, file_stat.st_size, content_hash(data))
+        if entry is not None and entry.path == descriptor_file_path and entry.hash == new_entry.hash:  # touched only
+            self.remember(mod_id, new_entry)
+            return None, None
+        return data.decode("utf-8-sig", errors="replace"), new_entry
+
+    def remember(self, mod_id: int, entry: ManifestEntry) -> None:
+        self.load()[mod_id] = entry
+        self.changed = True
+
+    def forget(self, mod_id: Optional[int]) -> None:
+        """ Removes the mod (e.g. deleted one) from the manifest """
+        if self.load().pop(mod_id, None) is not None:
+            self.changed = True
@@ -0,0 +1,173 @@
+import re
+from typing import NamedTuple
+from Tracing import traced
+
+# ↓ one token per match, leading whitespace is skipped: comment, 'key = value' pair or 'key = {',
+#   operator, scalar or a quoted string that isn't closed before the end of the file
+QUOTED = r'"[^"\\]*(?:\\.[^"\\]*)*'  # quoted string without the closing quote
+SCALAR = QUOTED + r'"|[^\s={}"\#]+'
+TOKEN_RE = re.compile(r'''\s*(?:
+    (%s)(?:\s*=\s*(%s|\{))?
+  | ([={}])
+  | \#[^\n]*
+  | (%s)\Z
+)''' % (SCALAR, SCALAR, QUOTED), re.VERBOSE)
+ESCAPE_RE = re.compile(r'\\(["\\])')  # only \" and \\ are escapes, other backslashes are kept (Windows paths)
+
+
+class Descriptor(NamedTuple):
+    """ Fields of a paradox descriptor (.mod) file that the app uses """
+    name: str = ""
+    version: str = ""
+    supported_version: str = ""
+    tags: tuple = ()
+    dependencies: tuple = ()
+    path: str = ""
+    picture: str = ""
+
+
+def read_text(stream) -> str:
+    """ Text of a file object or of an iterable of strings (e.g. lines), a descriptor is a few hundred bytes """
+    text = stream.read() if hasattr(stream, "read") else "".join(stream)
+    return text[1:] if text.startswith("\ufeff") else text  # BOM
+
+
+def tokenize(stream) -> list:
+    """ Returns (scalar, value, operator, open string) for every token, found by one findall over the whole text.
+        'key = value' comes as one token, 'key = {' has '{' as its value. Quoted strings keep their quotes """
+    return TOKEN_RE.findall(read_text(stream))
+
+
+def unquote(text: str) -> str:
+    """ Removes quotes of a quoted string and the backslashes of escaped quotes and backslashes """
+    if text[0] != '"':
+        return text
+    text = text[1:-1]
+    return ESCAPE_RE.sub(r"\1", text) if "\\" in text else text
+
+
+class RepeatedValues(list):
+    """ All values of a key that occurs more than once in a block """
+
+
+class Block:
+    """ Content of the file or of a {} block while it is parsed """
+    __slots__ = ("key", "pairs", "items", "pending", "waiting_key")
+
+    def __init__(self, key: str = None):
+        self.key = key  # key of this block in the parent block, None for a block without key
+        self.pairs = {}  # key = value
+        self.items = []  # values without key (e.g. tags = { "a" "b" })
+        self.pending = None  # the last scalar, it is a key if '=' follows it
+        self.waiting_key = None  # key whose value is expected
+
+    def add(self, key: str, value) -> None:
+        """ Stores key = value, a repeated key keeps all its values """
+        if key not in self.pairs:
+            self.pairs[key] = value
+        elif isinstance(self.pairs[key], RepeatedValues):
+            self.pairs[key].append(value)
+        else:
+            self.pairs[key] = RepeatedValues([self.pairs[key], value])
+
+    def flush(self) -> None:
+        """ The pending scalar wasn't followed by '=', so it is an item """
+        if self.pending is not None:
+            self.items.append(self.pending)
+            self.pending = None
+
+    def value(self):
+        """ A block with keys becomes a dict, otherwise a list of its items """
+        self.flush()
+        return self.pairs if self.pairs else self.items
+
+
+def close_block(stack: list) -> None:
+    """ Pops the block and puts its value into the parent block """
+    closed = stack.pop()
+    if closed.key is not None:
+        stack[-1].add(closed.key, closed.value())
+    else:
+        stack[-1].items.append(closed.value())
+
+
+def parse(stream) -> dict:
+    """ Parses a paradox script stream (descriptor file) into dicts and lists. Comments are skipped,
+        nested blocks are supported, unbalanced braces don't stop the parser """
+    stack = [Block()]
+    block = stack[0]
+    for scalar, value, operator, open_string in tokenize(stream):
+        if value:  # 'key = value' or 'key = {'
+            if block.pending is not None:
+                block.flush()
+            key = unquote(scalar)
+            if value == "{":
+                block = Block(key)
+                stack.append(block)
+            elif key in block.pairs:
+                block.add(key, unquote(value))
+            else:
+                block.pairs[key] = unquote(value)  # the most common token, Block.add isn't called for it
+        elif scalar or open_string:
+            scalar = unquote(scalar or open_string + '"')  # the file may end inside a string
+            if block.waiting_key is not None:  # 'key' '=' 'value' separated by a comment
+                block.add(block.waiting_key, scalar)
+                block.waiting_key = None
+            else:
+                if block.pending is not None:
+                    block.flush()
+                block.pending = scalar
+        elif operator == "=":
+            if block.pending is not None:
+                block.waiting_key, block.pending = block.pending, None
+        elif operator == "{":
+            if block.waiting_key is not None:  # 'key' '=' '{' separated by a comment
+                block = Block(block.waiting_key)
+                stack[-1].waiting_key = None
+            else:
+                block.flush()
+                block = Block()
+            stack.append(block)
+        elif operator and len(stack) > 1:  # "}", a stray one at the top level is skipped
+            close_block(stack)
+            block = stack[-1]
+    while len(stack) > 1:  # the file ends inside a block
+        close_block(stack)
+    return stack[0].value() if stack[0].pairs else {}
+
+
+def text_value(value) -> str:
+    """ A scalar value of the key, the last one if the key is repeated """
+    if isinstance(value, RepeatedValues):
+        value = value[-1]
+    return value if isinstance(value, str) else ""
+
+
+def list_value(value) -> tuple:
+    """ Strings of a {} block (or a single string) """
+    if isinstance(value, str):
+        return (value,)
+    if isinstance(value, RepeatedValues):
+        return tuple(item for part in value for item in list_value(part))
+    if isinstance(value, list):
+        return tuple(item for item in value if isinstance(item, str))
+    return ()
+
+
+@traced("parse")
+def read_descriptor_stream(stream) -> Descriptor:
+    """ Parses a descriptor stream into a Descriptor """
+    data = parse(stream)
+    return Descriptor(name=text_value(data.get("name", data.get("title", ""))),
+                      version=text_value(data.get("version", "")),
+                      supported_version=text_value(data.get("supported_version", "")),
+                      tags=list_value(data.get("tags", ())),
+                      dependencies=list_value(data.get("dependencies", ())),
+                      path=text_value(data.get("path", data.get("archive", ""))),
+                      picture=text_value(data.get("picture", data.get("poster", ""))))
+
+
+def read_descriptor(descriptor_file_path: str) -> Descriptor:
+    """ Parses a descriptor file (.mod or descriptor.txt). BOM at the beginning of the file is skipped """
+    with open(descriptor_file_path, encoding="utf-8-sig") as descriptor_file:
+        return read_descriptor_stream(descriptor_file)
@@ -1,63 +1,56 @@
+import sqlite3
 from ModWidget import *
-from typing import Union
-
-
-def connect_base(database_name: str, lang: str) -> Union[str, sqlite3.Connection]:
-    """ Creates a database connection, returns feedback in case of an error """
-    try:
-        con = sqlite3.connect(database_name)
-        con.cursor()
-        return con
-    except Exception as error:
-        if lang == "RU":
-            return f"Ошибка при подключении к базе данных: {error}"
-        else:
-            return f"Database connection error: {error}"
-
-
-class Game:
-    def __init__(self, button):
-        self.id = None
-        self.title = None
-        self.mods = []
-        self.button = button
-
-    def import_mods(self, database_name: str, app):
-        """ Gets all mods from a base by game_id (if id of a game == game_ifd of a mod) """
-        con = connect_base(database_name, "No_lang")
-        if type(con) == sqlite3.Connection:
-            cur = con.cursor()
-            all_mod_args = cur.execute("""SELECT * FROM Mods WHERE Game_ID = ?""", (self.id,)).fetchall()
-            for mod_args in sorted(all_mod_args):
-                new_mod = ModInfoWidget(self, app)
-                new_mod.clear_args()
-                new_mod.game_id = mod_args[1]
-                new_mod.title = mod_args[2]
-                new_mod.tags = mod_args[3]
-                new_mod.mod_version = mod_args[4]
-                new_mod.supported_game_version = mod_args[5]
-                new_mod.required_mods = mod_args[6]
-                new_mod.filepath = mod_args[7]
-                new_mod.incompatible_mods = mod_args[8]
-                new_mod.commentary = mod_args[9]
-                new_mod.image_path = mod_args[10]
-                new_mod.initUI()
-                new_mod.saved = True
-                new_mod.savedLabel.setText(new_mod.widget_localization["saved"])
-                self.mods.append(new_mod)
-        else:
-            print(con)
-
-    def update_title(self, database_name: str, new_title: str):
-        """ Renames game in a database. Executes sql query """
-        con = connect_base(database_name, "No_lang")
-        if type(con) == sqlite3.Connection:
-            cur = con.cursor()
-            cur.execute('''UPDATE Games
-                           SET Game_title = ? 
-                           WHERE Game_title = ?''', (new_title, self.title))
-            con.commit()
-            con.close()
-            self.title = new_title
-        else:
-            print(con)
+from GameLibrary import *
+from ModScanner import scan_folder, read_mod
+from ModDiscovery import parse_depth, parse_patterns
+from Database import get_database, SELECT_GAME_MODS
+from PyQt5.QtCore import QThread, pyqtSignal
+import threading
+
+
+class GamesPrefetcher(QThread):
+    """ Imports mods of the not yet opened games in the background after the main window is shown """
+    game_loaded = pyqtSignal(int, list)  # game id, list of ModRecords
+
+    def __init__(self, database_name: str, game_ids: list, parent=None):
+        super().__init__(parent)
+        self.database_name = database_name
+        self.game_ids = game_ids
+
+    def run(self):
+        try:
+            with get_database(self.database_name).worker_connection() as con:  # GUI connection can't be used here
+                for game_id in self.game_ids:
+                    if self.isInterruptionRequested():
+                        break
+                    all_mod_args = con.execute(SELECT_GAME_MODS, (game_id,)).fetchall()
+                    self.game_loaded.emit(game_id, [ModRecord.from_row(mod_args) for mod_args in sorted(all_mod_args)])
+        except sqlite3.Error as error:
+            print(error)
+
+
+class FolderScanner(QThread):
+    """ Finds and parses all mods of the folder in the background (see ModScanner.scan_folder). Depth and ignore
+        patterns of the walk are 'scan_depth = 2' and 'scan_ignore = pattern;pattern' of the config """
+    progress = pyqtSignal(int, int)  # parsed descriptors, all descriptors
+    scanned = pyqtSignal(list, list)  # [ModRecord], [(descriptor path, error)]
+    failed = pyqtSignal(str)  # the folder can't be read
+
+    def __init__(self, folder_path: str, parent=None):
+        super().__init__(parent)
+        self.folder_path = folder_path
+        self.max_depth = parse_depth(SETTINGS.get("scan_depth"))
+        self.ignore = parse_patterns(SETTINGS.get("scan_ignore"))
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            records, failures = scan_folder([self.folder_path], self.progress.emit, self.cancel_event,
+                                            max_depth=self.max_depth, ignore=self.ignore)
+        except OSError as error:
+            self.failed.emit(str(error))
+            return
+        self.scanned.emit(records, failures)
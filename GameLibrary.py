@@ -0,0 +1,424 @@
+import sqlite3
+from typing import NamedTuple, Optional, Union
+from AppSettings import SETTINGS
+from ModRecord import ModRecord
+from ModScanner import fill_record
+from ModDiscovery import ModFolder, mod_folder
+from ModFingerprint import EMPTY_FINGERPRINT, FileState, fingerprint_folders
+from DescriptorParser import read_descriptor_stream
+from DescriptorManifest import DescriptorManifest
+from TagIndex import TagIndex, split_tags
+from DependencyGraph import DependencyGraph, title_key
+from ConflictIndex import ConflictIndex, game_files
+from GameVersion import VersionIndex
+from Tracing import traced
+from Database import get_database, execute_batch, write_tags, read_mod_files, write_mod_files, SELECT_GAMES, \
+    SELECT_GAME_MODS, INSERT_MOD, UPDATE_MOD, DELETE_MOD, DELETE_GAME_MODS, DELETE_GAME, UPDATE_GAME_TITLE, \
+    SET_FIRST_FINGERPRINT
+
+FINGERPRINT_WRITE_BATCH = 100  # file states of this many mods are written in one transaction
+
+
+def connect_base(database_name: str, lang: str = "") -> Union[str, sqlite3.Connection]:
+    """ Returns the shared connection of the database (see Database.py), it is opened on the first call.
+        Returns feedback in case of an error (in the app language by default) """
+    try:
+        return get_database(database_name).connection()
+    except Exception as error:
+        if (lang or SETTINGS.get_lang()) == "RU":
+            return f"Ошибка при подключении к базе данных: {error}"
+        else:
+            return f"Database connection error: {error}"
+
+
+class UpdateReport(NamedTuple):
+    """ Result of Game.update_mods """
+    skipped: int  # descriptor hasn't changed since the last update
+    parsed: int  # descriptor has been parsed again
+    written: int  # mod has been saved to the database
+    not_updated: list  # titles of mods that couldn't be updated
+
+
+class FingerprintReport(NamedTuple):
+    """ Result of Game.fingerprint_mods """
+    hashed_files: int  # files that have been read, the others haven't changed since the last run
+    hashed_bytes: int
+    changed: list  # mods whose files have changed since the mod was saved
+    duplicates: list  # mods whose files are the same as of another mod of the game (see ModRecord.duplicate_of)
+    not_fingerprinted: list  # titles of mods whose files couldn't be read
+
+
+class Game:
+    """ A game and its mods. The button is the game's button in the main window (None without GUI) """
+    def __init__(self, button=None):
+        self.id = None
+        self.title = None
+        self.mods = {}  # ModRecords in the list order: {mod: its key in mods_by_key}, removal doesn't search the list
+        self.mods_by_key = {}  # (title, filepath): {mod: None}, unsaved mods (e.g. blank ones) may share a key
+        self.mods_by_id = {}  # Mod_ID: mod, saved mods only
+        self.tag_index = TagIndex()  # tag: mods with it
+        self.dependency_graph = DependencyGraph()  # required and incompatible mods
+        self.version_index = VersionIndex()  # supported game versions, mods sorted by them
+        self.conflict_index = ConflictIndex()  # files of the mods, filled by index_files (it reads the folders)
+        self.button = button
+        self.loaded = False  # mods are imported from the database only when the game is opened (or prefetched)
+
+    @traced("database")
+    def import_mods(self, database_name: str):
+        """ Gets all mods from a base by game_id (if id of a game == game_ifd of a mod) """
+        con = connect_base(database_name)
+        if isinstance(con, sqlite3.Connection):
+            all_mod_args = con.execute(SELECT_GAME_MODS, (self.id,)).fetchall()
+            self.set_mods([ModRecord.from_row(mod_args) for mod_args in sorted(all_mod_args)])
+        else:
+            print(con)
+
+    def load_mods(self, database_name: str):
+        """ Imports mods of the game the first time it is needed """
+        if not self.loaded:
+            self.import_mods(database_name)
+
+    def set_mods(self, mods: list):
+        """ Adds imported mods to the game and marks it as loaded """
+        self.add_mods(mods)
+        self.loaded = True
+
+    def add_mod(self, mod: ModRecord) -> None:
+        """ Adds the mod to the end of the game's list and to the indexes """
+        key = (mod.title, mod.filepath)
+        self.mods[mod] = key
+        self.mods_by_key.setdefault(key, {})[mod] = None
+        if mod.mod_id is not None:
+            self.mods_by_id[mod.mod_id] = mod
+        self.tag_index.add(mod)
+        self.dependency_graph.add(mod)
+        self.version_index.add(mod)
+
+    def add_mods(self, mods: list) -> None:
+        for mod in mods:
+            self.add_mod(mod)
+
+    def remove_mod(self, mod: ModRecord) -> None:
+        """ Removes the mod from the game's list and from the indexes """
+        key = self.mods.pop(mod)
+        same_key_mods = self.mods_by_key[key]
+        del same_key_mods[mod]
+        if not same_key_mods:
+            del self.mods_by_key[key]
+        if self.mods_by_id.get(mod.mod_id) is mod:
+            del self.mods_by_id[mod.mod_id]
+        self.tag_index.remove(mod)
+        self.dependency_graph.remove(mod)
+        self.version_index.remove(mod)
+        self.conflict_index.remove(mod)
+
+    def reindex(self, mod: ModRecord) -> None:
+        """ Moves the mod in the indexes after its title, filepath, tags, relations or version have been edited
+            or it has got an id """
+        key = (mod.title, mod.filepath)
+        old_key = self.mods.get(mod)
+        if old_key is None:  # not a mod of this game
+            return
+        if old_key != key:
+            same_key_mods = self.mods_by_key[old_key]
+            del same_key_mods[mod]
+            if not same_key_mods:
+                del self.mods_by_key[old_key]
+            self.mods[mod] = key  # an existing dict key keeps its place, so the mod keeps its place in the list
+            self.mods_by_key.setdefault(key, {})[mod] = None
+        if mod.mod_id is not None:
+            self.mods_by_id[mod.mod_id] = mod
+        self.tag_index.add(mod)  # nothing is done if the tags haven't changed
+        self.dependency_graph.add(mod)  # the same for title and relations
+        self.version_index.add(mod)  # and for the supported version
+
+    def find_mod(self, title: str, filepath: str, other_than: ModRecord = None) -> Optional[ModRecord]:
+        """ Returns a mod of the game with the key (title, filepath) except other_than, None if there is none """
+        for mod in self.mods_by_key.get((title, filepath), ()):
+            if mod is not other_than:
+                return mod
+        return None
+
+    def mod_by_id(self, mod_id: int) -> Optional[ModRecord]:
+        return self.mods_by_id.get(mod_id)
+
+    def find_mod_folder(self, mod: ModRecord) -> ModFolder:
+        """ Returns the descriptors and pictures of the mod folder (ModFolder.descriptor is '' if there is none),
+            the folder is read once for both. Raises OSError """
+        return mod_folder(mod.filepath) if mod.filepath else ModFolder(mod.filepath, (), ())
+
+    @traced("files")
+    def index_files(self, mods: list = None, only_new: bool = False) -> list:
+        """ Reads the folders of the mods (all by default) into the conflict index, a mod whose folder has changed
+            is re-indexed alone. With only_new, mods already indexed from the same folder are skipped.
+            Returns titles of mods whose folder couldn't be read (they are removed from the index) """
+        not_indexed = []
+        for mod in (self.mods if mods is None else mods):
+            if mod.game_id == -1 or (only_new and mod.filepath and
+                                     self.conflict_index.indexed_folder(mod) == mod.filepath):
+                continue
+            try:
+                self.conflict_index.set_files(mod, mod.filepath, game_files(mod.filepath) if mod.filepath else [])
+            except OSError as error:
+                print(error)
+                self.conflict_index.remove(mod)
+                not_indexed.append(mod.title)
+        return not_indexed
+
+    def load_order_rank(self) -> dict:
+        """ Returns {mod: position in the load order} for ConflictIndex: requirements are loaded before the mods that
+            need them (see DependencyGraph.load_order), mods with the same title in the list order """
+        order, cycled = self.dependency_graph.load_order()
+        positions = {key: index for index, key in enumerate(order + cycled)}
+        return {mod: (positions.get(title_key(mod.title), len(positions)), index) for index, mod in enumerate(self.mods)}
+
+    def update_mod(self, mod: ModRecord, database_name: str, descriptor_file_path: str, images: tuple = None) -> str:
+        """ Updates mod fields from the descriptor file and saves the mod. Returns title of the mod if it wasn't saved.
+            images are pictures of the descriptor's folder if they are already found """
+        fill_record(mod, descriptor_file_path, images=images)
+        return self.save_mod(mod, database_name)
+
+    @traced("database")
+    def update_mods(self, database_name: str, manifest: DescriptorManifest, mods: list = None) -> UpdateReport:
+        """ Updates mods of the game (all by default) from their descriptors. Mods whose descriptor is the same
+            as in the manifest are skipped, parsed mods whose fields have changed (or unsaved ones) are written
+            to the database in one transaction """
+        skipped = parsed = written = 0
+        not_updated = []
+        changed = {}  # mod: ManifestEntry of its descriptor, remembered once the mod is written
+        for mod in (self.mods if mods is None else mods):
+            if mod.game_id == -1:  # check if mod deleted (legacy, 'cause program pop all deleted games from the list)
+                continue
+            try:
+                descriptor_file_path, images = manifest.known_descriptor(mod.mod_id, mod.filepath), None
+                if not descriptor_file_path:
+                    found = self.find_mod_folder(mod)
+                    descriptor_file_path, images = found.descriptor, found.images
+                if not descriptor_file_path:
+                    skipped += 1
+                    continue
+                text, entry = manifest.read_if_changed(mod.mod_id, descriptor_file_path)
+                if entry is None:
+                    skipped += 1
+                    continue
+                old_args = mod.get_args() + [mod.image_path]
+                fill_record(mod, descriptor_file_path, read_descriptor_stream([text]), images)
+                parsed += 1
+                if mod.saved and mod.get_args() + [mod.image_path] == old_args:
+                    manifest.remember(mod.mod_id, entry)
+                    continue
+                changed[mod] = entry
+            except Exception as error:
+                print(error)
+                self.reindex(mod)  # the descriptor may have been read partly
+                not_updated.append(mod.title)
+        not_written = set(self.write_mods(database_name, list(changed))) if changed else set()
+        for mod, entry in changed.items():
+            if mod in not_written:
+                not_updated.append(mod.title)
+            else:
+                written += 1
+                manifest.remember(mod.mod_id, entry)
+        manifest.save()
+        return UpdateReport(skipped, parsed, written, not_updated)
+
+    @traced("files")
+    def fingerprint_mods(self, database_name: str, mods: list = None, max_workers: int = None,
+                         cancel_event=None) -> FingerprintReport:
+        """ Fingerprints files of the mods (all by default), see ModFingerprint.py. A file is hashed only if its mtime
+            or size differ from the last run, states of the files of saved mods are kept in the database.
+            A saved mod without a fingerprint gets this one as its fingerprint at the last save.
+            Marks the mods of the game whose files are the same, the first saved one is the original """
+        con = connect_base(database_name)
+        if not isinstance(con, sqlite3.Connection):
+            print(con)  # the files are hashed anyway, nothing is remembered
+            con = None
+
+        def known_states(mod: ModRecord) -> dict:
+            if con is None or not mod.saved or mod.mod_id is None:
+                return {}
+            return {file_path: FileState(*state) for file_path, state in read_mod_files(con, mod.mod_id).items()}
+
+        def write(mod_files: list, first_fingerprints: list) -> None:
+            try:
+                with con:
+                    write_mod_files(con, mod_files)
+                    con.executemany(SET_FIRST_FINGERPRINT, first_fingerprints)
+            except sqlite3.Error as error:
+                print(error)  # the files will be hashed again next time
+
+        hashed_files = hashed_bytes = 0
+        not_fingerprinted = []
+        mod_files, first_fingerprints = [], []  # not written yet
+        folders = [(mod, mod.filepath) for mod in (self.mods if mods is None else mods)
+                   if mod.filepath and mod.game_id != -1]
+        for result in fingerprint_folders(folders, known_states, max_workers, cancel_event):
+            mod = result.key
+            mod.current_fingerprint = result.fingerprint
+            hashed_files += result.hashed_files
+            hashed_bytes += result.hashed_bytes
+            if result.fingerprint is None:
+                print(*result.errors, sep="\n")
+                not_fingerprinted.append(mod.title)
+                continue
+            if con is None or not mod.saved or mod.mod_id is None:
+                continue
+            if result.hashed_files or result.removed_files:
+                mod_files.append((mod.mod_id, result.states))
+            if mod.fingerprint is None:
+                mod.fingerprint = result.fingerprint
+                first_fingerprints.append((result.fingerprint, mod.mod_id))
+            if len(mod_files) + len(first_fingerprints) >= FINGERPRINT_WRITE_BATCH:
+                write(mod_files, first_fingerprints)
+                mod_files, first_fingerprints = [], []
+        if mod_files or first_fingerprints:
+            write(mod_files, first_fingerprints)
+
+        originals = {}  # fingerprint: the first saved mod with it
+        for mod in sorted(self.mods, key=lambda mod: (mod.mod_id is None, mod.mod_id or 0)):
+            mod.duplicate_of = None
+            if mod.current_fingerprint is None or mod.current_fingerprint == EMPTY_FINGERPRINT:
+                continue
+            original = originals.setdefault(mod.current_fingerprint, mod)
+            if original is not mod:
+                mod.duplicate_of = original
+        return FingerprintReport(hashed_files, hashed_bytes, [mod for mod in self.mods if mod.changed_since_save],
+                                 [mod for mod in self.mods if mod.duplicate_of is not None], not_fingerprinted)
+
+    def save_mod(self, mod: ModRecord, database_name: str) -> str:
+        """ Saves/updates the mod in the database. Returns title of the mod if it wasn't saved
+            (e.g. another mod of the game has the same key (title, filepath), the database doesn't allow that) """
+        con = connect_base(database_name)
+        if not isinstance(con, sqlite3.Connection):
+            print(con)
+            return mod.title
+        try:
+            with con:
+                if mod.saved and mod.mod_id is not None:  # update the mod in the database (mod is already saved in the database)
+                    mod_id = mod.mod_id
+                    con.execute(UPDATE_MOD, mod.update_args())
+                else:  # add the mod to the database
+                    mod_id = con.execute(INSERT_MOD, mod.insert_args()).lastrowid
+                write_tags(con, [(mod_id, split_tags(mod.tags))])
+            mod.mark_saved(mod_id)
+        except sqlite3.Error as error:
+            print(error)
+            return mod.title
+        finally:
+            self.reindex(mod)
+        return ""
+
+    def save_mods(self, database_name: str, mods: list = None) -> list:
+        """ Saves/updates mods of the game (all by default) in one transaction. Returns titles of the mods that
+            weren't saved, the database rejects mods with the same key (title, filepath) """
+        return [mod.title for mod in self.write_mods(database_name, list(self.mods) if mods is None else mods)]
+
+    @traced("database")
+    def write_mods(self, database_name: str, mods: list) -> list:
+        """ Saves/updates the mods in one transaction, returns the mods that weren't saved """
+        con = connect_base(database_name)
+        if not isinstance(con, sqlite3.Connection):
+            print(con)
+            return list(mods)
+
+        not_saved_mods, updated, inserted = [], [], []
+        for mod in mods:
+            if mod.game_id == -1:  # check if mod deleted (legacy, 'cause program pop all deleted games from the list)
+                continue
+            if mod.saved and mod.mod_id is not None:
+                updated.append(mod)
+            else:
+                inserted.append(mod)
+
+        new_ids = {}
+        try:
+            with con:  # one transaction, it is rolled back if the database fails
+                failed = set(execute_batch(con, UPDATE_MOD, [mod.update_args() for mod in updated]))
+                not_saved_mods.extend(updated[index] for index in sorted(failed))
+                for mod in inserted:  # one by one, every new mod needs its id
+                    try:
+                        new_ids[mod] = con.execute(INSERT_MOD, mod.insert_args()).lastrowid
+                    except sqlite3.IntegrityError as error:
+                        print(error)
+                        not_saved_mods.append(mod)
+                written = [mod for index, mod in enumerate(updated) if index not in failed]
+                write_tags(con, [(mod.mod_id, split_tags(mod.tags)) for mod in written] +
+                                [(mod_id, split_tags(mod.tags)) for mod, mod_id in new_ids.items()])
+        except sqlite3.Error as error:
+            print(error)
+            return [mod for mod in mods if mod.game_id != -1]
+        for mod in written:
+            mod.mark_saved(mod.mod_id)
+        for mod, mod_id in new_ids.items():
+            mod.mark_saved(mod_id)
+        for mod in mods:
+            self.reindex(mod)
+        return not_saved_mods
+
+    @traced("database")
+    def delete(self, database_name: str) -> bool:
+        """ Deletes the game with all its mods from the database in one transaction. Returns False if it has failed """
+        con = connect_base(database_name)
+        if not isinstance(con, sqlite3.Connection):
+            print(con)
+            return False
+        try:
+            with con:
+                con.execute(DELETE_GAME_MODS, (self.id,))
+                con.execute(DELETE_GAME, (self.title,))
+        except sqlite3.Error as error:
+            print(error)
+            return False
+        for mod in self.mods:
+            mod.saved = False
+            mod.game_id = -1  # means the mod is deleted
+        self.mods.clear()
+        self.mods_by_key.clear()
+        self.mods_by_id.clear()
+        self.tag_index.clear()
+        self.dependency_graph = DependencyGraph()
+        self.version_index.clear()
+        self.conflict_index.clear()
+        return True
+
+    def delete_mod(self, mod: ModRecord, database_name: str) -> bool:
+        """ Deletes the mod from the database and from the game. Returns False if it has failed, the mod is kept """
+        if mod.saved:  # case when the mod is in the database
+            con = connect_base(database_name)
+            if not isinstance(con, sqlite3.Connection):
+                print(con)
+                return False
+            try:
+                with con:
+                    con.execute(DELETE_MOD, (mod.mod_id, mod.game_id))
+            except sqlite3.Error as error:
+                print(error)
+                return False
+            mod.saved = False
+        mod.game_id = -1  # means the mod is deleted
+        self.remove_mod(mod)
+        return True
+
+    def update_title(self, database_name: str, new_title: str):
+        """ Renames game in a database. Executes sql query """
+        con = connect_base(database_name)
+        if isinstance(con, sqlite3.Connection):
+            con.execute(UPDATE_GAME_TITLE, (new_title, self.title))
+            con.commit()
+            self.title = new_title
+        else:
+            print(con)
+
+
+@traced("database")
+def load_games(database_name: str) -> Union[str, list]:
+    """ Returns games of the database without their mods (see Game.load_mods) or feedback in case of an error """
+    con = connect_base(database_name)
+    if not isinstance(con, sqlite3.Connection):
+        return con
+    games = []
+    for game_id, game_title in con.execute(SELECT_GAMES).fetchall():
+        game = Game()
+        game.id, game.title = game_id, game_title
+        games.append(game)
+    return games
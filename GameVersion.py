@@ -0,0 +1,122 @@
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Optional
+
+VERSION_WIDTH = 6  # digits of a version number in a key, '1.10' → '000001.000010'
+LOWEST_KEY, HIGHEST_KEY = "", "~"  # before and after every version key ('~' is after the digits)
+PATTERN = r"v?(\d+(?:\.\d+)*)(?:\.?\*|\.x)*"  # '1.9.3', 'v1.9', '1.9.*', '1.9.x', '1.9.*.*', '1.9.3*'
+ANY_RE = re.compile(r"[*x](?:\.[*x])*", re.IGNORECASE)  # '*', '*.*.*'
+PATTERN_RE = re.compile(PATTERN, re.IGNORECASE)
+RANGE_RE = re.compile(rf"{PATTERN}\s*-\s*{PATTERN}", re.IGNORECASE)
+COMPARISON_RE = re.compile(rf"(>=|<=|>|<|=)\s*{PATTERN}\s*,?\s*", re.IGNORECASE)
+
+
+def version_key(numbers: tuple) -> str:
+    """ Key of the version that sorts as text in the order of versions: '1.9' < '1.9.3' < '1.10' """
+    return ".".join(str(min(number, 10 ** VERSION_WIDTH - 1)).zfill(VERSION_WIDTH) for number in numbers)
+
+
+def after_key(numbers: tuple) -> str:
+    """ Key of the first version after the version and all its sub-versions: 1.9 → 1.10 """
+    return version_key(numbers[:-1] + (numbers[-1] + 1,))
+
+
+def parse_numbers(text: str) -> tuple:
+    return tuple(int(number) for number in text.split("."))
+
+
+@lru_cache(maxsize=1024)  # mods of a game share a few versions
+def version_range(text: str) -> Optional[tuple]:
+    """ Returns (low key, high key) of the versions the text means, low is included, high is not. None if the text
+        isn't a version. A version means itself and its sub-versions ('1.9' and '1.9.*' are 1.9.0, 1.9.3, ...).
+        Supported forms: '*', '1.9.3', 'v1.9.*', '1.9.*.*', '1.8 - 1.9.*', '>=1.8 <1.10' (also '>', '<=', '=', ',' between) """
+    text = (text or "").strip()
+    if not text:
+        return None
+    if ANY_RE.fullmatch(text):
+        return LOWEST_KEY, HIGHEST_KEY
+    found = PATTERN_RE.fullmatch(text)
+    if found:
+        numbers = parse_numbers(found.group(1))
+        return version_key(numbers), after_key(numbers)
+    found = RANGE_RE.fullmatch(text)
+    if found:
+        return version_key(parse_numbers(found.group(1))), after_key(parse_numbers(found.group(2)))
+
+    low, high, position = LOWEST_KEY, HIGHEST_KEY, 0
+    while position < len(text):
+        found = COMPARISON_RE.match(text, position)
+        if not found:
+            return None
+        operator, numbers = found.group(1), parse_numbers(found.group(2))
+        if operator in (">=", "="):
+            low = max(low, version_key(numbers))
+        if operator == ">":
+            low = max(low, after_key(numbers))
+        if operator in ("<=", "="):
+            high = min(high, after_key(numbers))
+        if operator == "<":
+            high = min(high, version_key(numbers))
+        position = found.end()
+    return low, high
+
+
+def version_low(text: str) -> Optional[str]:
+    """ Low key of the version text for the database (Mods.Gversion_Low), NULL if it isn't a version """
+    found = version_range(text)
+    return found[0] if found else None
+
+
+def version_high(text: str) -> Optional[str]:
+    found = version_range(text)
+    return found[1] if found else None
+
+
+class VersionIndex:
+    """ Supported game versions of a game's mods as key ranges. Mods sorted by version are kept until a mod's version
+        changes, 'compatible with version X' is a binary search in them """
+    def __init__(self):
+        self.range_of = {}  # mod: (supported_game_version the mod was indexed with, (low, high) or None)
+        self.order = None  # mods with a version sorted by their range, None after a change
+        self.lows = None  # low keys of the order, for bisect
+
+    def add(self, mod) -> None:
+        """ Indexes the mod or re-indexes it if its supported version has changed """
+        indexed = self.range_of.get(mod)
+        if indexed is not None and indexed[0] == mod.supported_game_version:
+            return
+        self.range_of[mod] = (mod.supported_game_version, version_range(mod.supported_game_version))
+        self.order = None
+
+    def remove(self, mod) -> None:
+        if self.range_of.pop(mod, None) is not None:
+            self.order = None
+
+    def clear(self) -> None:
+        self.range_of.clear()
+        self.order = None
+
+    def sorted_mods(self) -> list:
+        """ Mods that have a version in the order of their versions, the mods of the same version in the list order """
+        if self.order is None:
+            ranged = [(version, mod) for mod, (_, version) in self.range_of.items() if version is not None]
+            ranged.sort(key=lambda item: item[0])
+            self.order = [mod for _, mod in ranged]
+            self.lows = [version[0] for version, _ in ranged]
+        return self.order
+
+    def without_version(self) -> list:
+        return [mod for mod, (_, version) in self.range_of.items() if version is None]
+
+    def compatible(self, text: str) -> Optional[set]:
+        """ Mods whose supported versions overlap the versions of the text, None if the text isn't a version """
+        query = version_range(text)
+        if query is None:
+            return None
+        order = self.sorted_mods()
+        found = set()
+        for mod in order[:bisect_left(self.lows, query[1])]:  # the ones that start before the end of the query
+            if self.range_of[mod][1][1] > query[0]:
+                found.add(mod)
+        return found
@@ -0,0 +1,151 @@
+""" Export and import of the mod library as JSON Lines or CSV (one mod per line with the title of its game).
+    Rows are streamed: the database is read by EXPORT_BATCH rows and written by IMPORT_CHUNK rows per transaction,
+    so memory doesn't grow with the library. Paths can be remapped for another computer ('D:/Steam=/home/me/Steam') """
+import csv
+import json
+import sqlite3
+from typing import Iterator, NamedTuple, TextIO
+from ModRecord import ModRecord
+from TagIndex import split_tags
+from Database import bulk_insert, write_tags, SELECT_EXPORT_MODS, SELECT_GAMES, INSERT_GAME, INSERT_MOD
+
+TRANSFER_FIELDS = ("mod_id", "game_id", "game", "title", "tags", "mod_version", "supported_game_version",
+                   "required_mods", "filepath", "incompatible_mods", "commentary", "image_path")
+MOD_FIELDS = TRANSFER_FIELDS[3:]  # ModRecord fields that are imported, ids belong to the database they came from
+EXPORT_BATCH = 2000  # rows fetched from the database at once
+IMPORT_CHUNK = 5000  # rows inserted by one transaction
+
+
+class ImportReport(NamedTuple):
+    """ Result of import_mods """
+    imported: int  # new mods in the database
+    duplicates: int  # the game already has a mod with the same title and filepath
+    bad_rows: list  # [(line number, error)] of the rows that can't be read
+    new_games: int
+
+
+def parse_remaps(remaps: list) -> list:
+    """ Makes [(old prefix, new prefix)] of 'old=new' texts, the longest prefixes first. Raises ValueError """
+    pairs = []
+    for remap in remaps or ():
+        old, separator, new = remap.partition("=")
+        if not separator or not old.strip():
+            raise ValueError(f"'{remap}' isn't OLD=NEW")
+        pairs.append((old.strip().replace("\\", "/").rstrip("/"), new.strip().replace("\\", "/").rstrip("/")))
+    return sorted(pairs, key=lambda pair: len(pair[0]), reverse=True)
+
+
+def remap_path(file_path: str, remaps: list) -> str:
+    """ Replaces the first matching prefix (whole folder names only), the path stays as it is if none matches """
+    if not file_path or not remaps:
+        return file_path
+    normalized = file_path.replace("\\", "/")
+    for old, new in remaps:
+        if normalized == old or normalized.startswith(old + "/"):
+            return new + normalized[len(old):]
+    return file_path
+
+
+def export_rows(con: sqlite3.Connection, game: str = "", remaps: list = ()) -> Iterator[dict]:
+    """ Yields mods of all games (or of the game with this title or id) as {field: value}, TRANSFER_FIELDS order """
+    cursor = con.execute(SELECT_EXPORT_MODS, {"game": game})
+    while True:
+        rows = cursor.fetchmany(EXPORT_BATCH)
+        if not rows:
+            break
+        for row in rows:
+            mod = dict(zip(TRANSFER_FIELDS, row))
+            mod["filepath"] = remap_path(mod["filepath"], remaps)
+            mod["image_path"] = remap_path(mod["image_path"], remaps)
+            yield mod
+
+
+def export_mods(con: sqlite3.Connection, output: TextIO, file_format: str = "json", game: str = "",
+                remaps: list = ()) -> int:
+    """ Writes the mods as JSON Lines ('json') or CSV ('csv') to the text file, returns the number of mods """
+    if file_format == "csv":
+        writer = csv.DictWriter(output, fieldnames=TRANSFER_FIELDS)
+        writer.writeheader()
+        write_row = writer.writerow
+    else:
+        def write_row(mod: dict) -> None:
+            output.write(json.dumps(mod, ensure_ascii=False) + "\n")
+    counter = 0
+    for counter, mod in enumerate(export_rows(con, game, remaps), 1):
+        write_row(mod)
+    return counter
+
+
+def read_rows(source: TextIO, file_format: str = "json") -> Iterator[tuple]:
+    """ Yields (line number, {field: value} or the error) of a JSON Lines or CSV file, one row at a time """
+    if file_format == "csv":
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield line_number, error
+            continue
+        yield line_number, row if type(row) == dict else ValueError("a line must be a json object")
+
+
+def row_record(row: dict, remaps: list) -> ModRecord:
+    """ Makes a record of the imported row, missing fields are empty. Raises ValueError if the row has no title """
+    record = ModRecord()
+    for field in MOD_FIELDS:
+        value = row.get(field)
+        setattr(record, field, "" if value is None else str(value))
+    if not record.title.strip():
+        raise ValueError("a mod must have a title")
+    record.filepath = remap_path(record.filepath, remaps)
+    record.image_path = remap_path(record.image_path, remaps)
+    return record
+
+
+def import_mods(con: sqlite3.Connection, source: TextIO, file_format: str = "json", game: str = "",
+                remaps: list = (), chunk_size: int = IMPORT_CHUNK) -> ImportReport:
+    """ Adds the mods of the file to the games with their titles (to the game with this title if it is given),
+        missing games are created. Every chunk_size rows are a transaction of their own, so a broken file
+        keeps the chunks before the error. Mods that the game already has are skipped. Raises sqlite3.Error """
+    game_ids = {title: game_id for game_id, title in con.execute(SELECT_GAMES)}
+    imported = duplicates = new_games = 0
+    bad_rows, chunk = [], []
+
+    def write_chunk() -> None:
+        nonlocal imported, duplicates, new_games
+        mod_tags = []
+        with con, bulk_insert(con):
+            for record, game_title in chunk:
+                if game_title not in game_ids:
+                    game_ids[game_title] = con.execute(INSERT_GAME, (game_title,)).lastrowid
+                    new_games += 1
+                record.game_id = game_ids[game_title]
+                try:
+                    mod_tags.append((con.execute(INSERT_MOD, record.insert_args()).lastrowid, split_tags(record.tags)))
+                except sqlite3.IntegrityError:  # the same key (title, filepath)
+                    duplicates += 1
+            write_tags(con, mod_tags)
+        imported += len(mod_tags)
+        chunk.clear()
+
+    for line_number, row in read_rows(source, file_format):
+        try:
+            if isinstance(row, Exception):
+                raise row
+            game_title = game or str(row.get("game") or "").strip()
+            if not game_title:
+                raise ValueError("no game title")
+            chunk.append((row_record(row, remaps), game_title))
+        except ValueError as error:
+            bad_rows.append((line_number, error))
+            continue
+        if len(chunk) >= chunk_size:
+            write_chunk()
+    if chunk:
+        write_chunk()
+    return ImportReport(imported, duplicates, bad_rows, new_games)
@@ -0,0 +1,122 @@
+""" Finds mod folders with os.scandir: every directory is read once and its entries give the descriptors, the pictures
+    and the subfolders together (the type of an entry comes with the listing, no extra stat on most systems).
+    Several library roots are walked down to a depth limit, names that match the ignore patterns are skipped """
+import fnmatch
+import re
+from os import scandir
+from typing import Callable, Iterator, NamedTuple, Optional
+from Tracing import traced
+
+DESCRIPTOR_EXTENSION = ".mod"
+TEXT_DESCRIPTOR = "descriptor.txt"  # descriptor of the mods that have no .mod file
+DEFAULT_DEPTH = 2  # levels below a root: <root>/<mod>/ and <workshop content>/<game id>/<mod>/
+DEFAULT_IGNORE = (".*", "__pycache__", "$RECYCLE.BIN", "System Volume Information")
+
+
+class ModFolder(NamedTuple):
+    """ Files of a folder that matter for a mod """
+    folder: str
+    descriptors: tuple  # 'descriptor.mod' first, then other .mod files, 'descriptor.txt' if there is no .mod
+    images: tuple  # candidate pictures, in the order of names
+
+    @property
+    def descriptor(self) -> str:
+        return self.descriptors[0] if self.descriptors else ""
+
+
+def ignore_matcher(patterns) -> Optional[Callable[[str], bool]]:
+    """ Returns a function that tells whether a file or folder name matches one of the patterns ('*.bak', '.*'),
+        case-insensitive as on Windows. None if there are no patterns """
+    patterns = [pattern.strip() for pattern in patterns or () if pattern.strip()]
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns), re.IGNORECASE).match
+
+
+def parse_roots(text: str) -> list:
+    """ Library roots of the config ('library_roots = folder;folder') """
+    return [normalize_root(root) for root in (text or "").split(";") if root.strip()]
+
+
+def parse_depth(text: str) -> int:
+    """ Depth limit of the config ('scan_depth = 2'), the default one if it isn't a number """
+    return int(text) if (text or "").strip().isdigit() else DEFAULT_DEPTH
+
+
+def parse_patterns(text: str) -> tuple:
+    """ Ignore patterns of the config ('scan_ignore = pattern;pattern'), the default ones if there are none """
+    patterns = tuple(pattern.strip() for pattern in (text or "").split(";") if pattern.strip())
+    return patterns or DEFAULT_IGNORE
+
+
+def read_folder(folder: str, ignored: Callable[[str], bool] = None, with_subfolders: bool = True) -> tuple:
+    """ Reads the folder once. Returns (ModFolder, [subfolder names]). Subfolders are listed only if they are needed
+        (the type of every entry is checked for them), their names aren't checked by ignored. Raises OSError """
+    found = {DESCRIPTOR_EXTENSION: [], TEXT_DESCRIPTOR: [], ".png": [], ".jpg": []}  # kind of file: names
+    subfolders = []
+    with scandir(folder) as entries:
+        for entry in entries:
+            name = entry.name
+            kind = name[-4:].lower()  # the extensions the app looks for have 4 characters, the rest are folders or skipped
+            if kind == ".txt":
+                kind = TEXT_DESCRIPTOR if name.lower() == TEXT_DESCRIPTOR else ""
+            files = found.get(kind)
+            if files is not None:
+                if entry.is_file() and not (ignored and ignored(name)):
+                    files.append(name)
+            elif with_subfolders and entry.is_dir():
+                subfolders.append(name)
+    mod_files = sorted(found[DESCRIPTOR_EXTENSION], key=lambda name: (name.lower() != "descriptor.mod", name))
+    descriptors = tuple(folder + "/" + name for name in (mod_files or found[TEXT_DESCRIPTOR]))
+    images = tuple(folder + "/" + name for name in sorted(found[".png"] + found[".jpg"]))
+    return ModFolder(folder, descriptors, images), subfolders
+
+
+def mod_folder(folder: str) -> ModFolder:
+    """ Descriptors and pictures of one mod folder. Raises OSError """
+    return read_folder(folder)[0]
+
+
+def normalize_root(root: str) -> str:
+    root = root.strip().replace("\\", "/")
+    return root.rstrip("/") or root
+
+
+def discover(roots, max_depth: int = DEFAULT_DEPTH, ignore=DEFAULT_IGNORE) -> Iterator[ModFolder]:
+    """ Yields the folders that have descriptors, root by root in the order of names. A folder with a descriptor is
+        a mod and its subfolders aren't walked (they are the mod's content), a mod folder gives one descriptor.
+        A root gives all its descriptors and is walked further: paradox 'mod' folder has .mod files of the workshop
+        mods and folders of the local ones. Folders deeper than max_depth below a root are skipped, a folder is read
+        once even if the roots overlap. Raises OSError if a root can't be read, other folders that can't be read
+        are printed and skipped """
+    ignored = ignore_matcher(ignore)
+    visited = set()
+    for root in roots:
+        root = normalize_root(root)
+        if not root or root in visited:
+            continue
+        stack = [(root, 0)]
+        while stack:
+            folder, depth = stack.pop()
+            if folder in visited:
+                continue
+            visited.add(folder)
+            try:
+                found, subfolders = read_folder(folder, ignored, with_subfolders=depth < max_depth)
+            except OSError as error:
+                if depth == 0:
+                    raise
+                print(error)
+                continue
+            if found.descriptors:
+                yield found if depth == 0 else found._replace(descriptors=found.descriptors[:1])
+                if depth > 0:
+                    continue
+            subfolders = [name for name in subfolders if ignored is None or not ignored(name)]  # only the walked ones
+            stack.extend((folder + "/" + name, depth + 1) for name in sorted(subfolders, reverse=True))
+
+
+@traced("files")
+def find_descriptors(roots, max_depth: int = DEFAULT_DEPTH, ignore=DEFAULT_IGNORE) -> list:
+    """ Returns [(descriptor path, pictures of its folder)] of all mods of the roots. Raises OSError """
+    return [(descriptor, found.images) for found in discover(roots, max_depth, ignore) for descriptor in found.descriptors]
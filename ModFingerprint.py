@@ -0,0 +1,148 @@
+""" Content fingerprints of mod folders: blake2b of every file (read by chunks, big files through mmap, so a multi-GB
+    total conversion never sits in memory) and a fingerprint of the whole tree made of the files' paths and hashes.
+    mtime and size of every hashed file are kept, a file is hashed again only if they have changed.
+    Files are hashed on a thread pool: hashlib and file reads release the GIL, so the threads run in parallel """
+import hashlib
+import mmap
+from collections import deque
+from os import fstat, scandir
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+CHUNK_SIZE = 1024 * 1024  # bytes given to the hash at once
+MMAP_SIZE = 64 * 1024 * 1024  # files from this size are mapped instead of read into a buffer
+MMAP_WINDOW = 16 * 1024 * 1024  # part of a big file that is mapped at once (a multiple of mmap.ALLOCATIONGRANULARITY)
+DIGEST_SIZE = 16
+MAX_PENDING_FILES = 2048  # files queued on the pool, folders are finished in order when there are more
+EMPTY_FINGERPRINT = hashlib.blake2b(digest_size=DIGEST_SIZE).hexdigest()  # folder without files
+
+
+class FileState(NamedTuple):
+    """ State of a file when it was hashed """
+    mtime_ns: int
+    size: int
+    hash: str
+
+
+class FolderFingerprint(NamedTuple):
+    """ Result of a folder """
+    key: object  # what the folder was given with (e.g. the ModRecord)
+    fingerprint: Optional[str]  # None if the folder or one of its files can't be read
+    states: dict  # relative path ('gfx/a.dds'): FileState
+    hashed_files: int  # files that were read, the others had the same mtime and size as before
+    hashed_bytes: int
+    removed_files: int  # files of the last run that are gone
+    errors: list  # [str]
+
+
+def file_hash(file_path: str, size: int) -> str:
+    """ blake2b of the file content. Big files are mapped by windows of MMAP_WINDOW bytes, one at a time,
+        so the mapped pages of a thread never take more memory than a window. Raises OSError """
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(file_path, "rb") as file:
+        if size >= MMAP_SIZE:
+            size = fstat(file.fileno()).st_size  # it may have changed since the folder was listed
+            for offset in range(0, size, MMAP_WINDOW):
+                with mmap.mmap(file.fileno(), min(MMAP_WINDOW, size - offset), access=mmap.ACCESS_READ,
+                               offset=offset) as mapped:
+                    with memoryview(mapped) as view:
+                        for start in range(0, len(view), CHUNK_SIZE):
+                            hasher.update(view[start:start + CHUNK_SIZE])
+        else:
+            buffer = bytearray(CHUNK_SIZE)
+            with memoryview(buffer) as view:
+                while True:
+                    length = file.readinto(buffer)
+                    if not length:
+                        break
+                    hasher.update(view[:length])
+    return hasher.hexdigest()
+
+
+def walk_files(folder: str) -> dict:
+    """ Returns {relative path: (mtime_ns, size)} of all files of the folder tree. Links to folders aren't followed
+        (they may loop). Raises OSError if the folder can't be read, unreadable subfolders too """
+    files = {}
+    stack = [(folder, "")]
+    while stack:
+        current, prefix = stack.pop()
+        with scandir(current) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, prefix + entry.name + "/"))
+                elif entry.is_file():
+                    file_stat = entry.stat()
+                    files[prefix + entry.name] = (file_stat.st_mtime_ns, file_stat.st_size)
+    return files
+
+
+def tree_fingerprint(states: dict) -> str:
+    """ Fingerprint of the files: the same paths with the same content give the same fingerprint wherever the folder is """
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for relative_path in sorted(states):
+        hasher.update(f"{relative_path}\0{states[relative_path].hash}\n".encode("utf-8", "surrogateescape"))
+    return hasher.hexdigest()
+
+
+class PendingFolder:
+    """ Folder whose files are being hashed """
+    def __init__(self, key, folder: str):
+        self.key = key
+        self.folder = folder
+        self.states = {}
+        self.futures = {}  # relative path: (mtime_ns, size, future of the hash)
+        self.errors = []
+        self.removed_files = 0  # files of the last run that are gone
+
+    def finish(self) -> FolderFingerprint:
+        hashed_bytes = 0
+        for relative_path, (mtime_ns, size, future) in self.futures.items():
+            try:
+                self.states[relative_path] = FileState(mtime_ns, size, future.result())
+                hashed_bytes += size
+            except OSError as error:
+                self.errors.append(str(error))
+        fingerprint = None if self.errors else tree_fingerprint(self.states)
+        return FolderFingerprint(self.key, fingerprint, self.states, len(self.futures), hashed_bytes,
+                                 self.removed_files, self.errors)
+
+
+def fingerprint_folders(folders: Iterable[tuple], known_states: Callable[[object], dict] = None,
+                        max_workers: int = None, cancel_event=None) -> Iterator[FolderFingerprint]:
+    """ Yields a FolderFingerprint for every (key, folder), in the same order. known_states(key) returns the FileStates
+        of the last run ({} if there are none), it is called from the thread that iterates. Files of the next folders
+        are hashed while the previous ones finish, at most MAX_PENDING_FILES at once, so memory doesn't grow with
+        the library. Stops early if cancel_event is set """
+    from concurrent.futures import ThreadPoolExecutor  # it takes ~15 ms to import, the app needs it only here
+    pending = deque()
+    pending_files = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for key, folder in folders:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            pending_folder = PendingFolder(key, folder)
+            try:
+                files = walk_files(folder)
+            except OSError as error:
+                pending_folder.errors.append(str(error))
+                files = {}
+            known = known_states(key) if known_states is not None else {}
+            pending_folder.removed_files = len(known.keys() - files.keys())
+            for relative_path, (mtime_ns, size) in files.items():
+                state = known.get(relative_path)
+                if state is not None and state.mtime_ns == mtime_ns and state.size == size:
+                    pending_folder.states[relative_path] = state
+                else:
+                    future = pool.submit(file_hash, folder + "/" + relative_path, size)
+                    pending_folder.futures[relative_path] = (mtime_ns, size, future)
+            pending.append(pending_folder)
+            pending_files += len(pending_folder.futures)
+            while pending and (pending_files > MAX_PENDING_FILES or not pending[0].futures):
+                pending_files -= len(pending[0].futures)
+                yield pending.popleft().finish()
+        if cancel_event is not None and cancel_event.is_set():
+            for pending_folder in pending:
+                for _, _, future in pending_folder.futures.values():
+                    future.cancel()
+            return
+        while pending:
+            yield pending.popleft().finish()
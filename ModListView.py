@@ -0,0 +1,228 @@
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QAbstractItemView
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, QTimer, QRect
+from PyQt5.QtGui import QColor, QImage
+from ModWidget import ModInfoWidget, ModRecord, THUMBNAIL_LOADER
+from Tracing import traced
+
+RECORD_ROLE = Qt.UserRole + 1  # model role that returns the ModRecord itself
+ROW_SIZE = QSize(950, 200)  # size of the ModInfoWidget
+HIGHLIGHT_COLORS = {"": QColor(100, 150, 220),
+                    "background-color: rgb(40, 175, 40)": QColor(40, 175, 40),
+                    "background-color: rgb(175, 40, 40)": QColor(175, 40, 40)}
+
+
+class ModListModel(QAbstractListModel):
+    """ List of ModRecords of the opened game in display order """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.records = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.records)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.records[index.row()]
+        if role == Qt.DisplayRole:
+            return record.title
+        elif role == Qt.BackgroundRole:
+            return HIGHLIGHT_COLORS.get(record.highlight, HIGHLIGHT_COLORS[""])
+        elif role == RECORD_ROLE:
+            return record
+        return None
+
+    def set_records(self, records: list) -> None:
+        """ Replaces all rows """
+        self.beginResetModel()
+        self.records = list(records)
+        self.endResetModel()
+
+    def append_record(self, record: ModRecord) -> QModelIndex:
+        """ Adds a row to the end, returns its index """
+        row = len(self.records)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.records.append(record)
+        self.endInsertRows()
+        return self.index(row)
+
+    def append_records(self, records: list) -> None:
+        """ Adds rows to the end in one batch """
+        if records:
+            row = len(self.records)
+            self.beginInsertRows(QModelIndex(), row, row + len(records) - 1)
+            self.records.extend(records)
+            self.endInsertRows()
+
+    def remove_record(self, record: ModRecord) -> None:
+        """ Removes the row of the record (if it is shown) """
+        for row, shown_record in enumerate(self.records):
+            if shown_record is record:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                self.records.pop(row)
+                self.endRemoveRows()
+                break
+
+    def refresh(self, highlight_only: bool = False) -> None:
+        """ Tells the view that records have been changed. If only highlight has been changed,
+            widgets keep the text that user has typed in them """
+        if self.records:
+            roles = [Qt.BackgroundRole] if highlight_only else []
+            self.dataChanged.emit(self.index(0), self.index(len(self.records) - 1), roles)
+
+    def refresh_records(self, records: list, highlight_only: bool = False) -> None:
+        """ Tells the view that some records have been changed, neighbouring rows are sent as one range """
+        changed = {id(record) for record in records}
+        if not changed:
+            return
+        roles = [Qt.BackgroundRole] if highlight_only else []
+        first = None
+        for row, record in enumerate(self.records + [None]):
+            if id(record) in changed:
+                if first is None:
+                    first = row
+            elif first is not None:
+                self.dataChanged.emit(self.index(first), self.index(row - 1), roles)
+                first = None
+
+    def refresh_record(self, record: ModRecord) -> None:
+        """ Tells the view that one record has been changed """
+        for row, shown_record in enumerate(self.records):
+            if shown_record is record:
+                self.dataChanged.emit(self.index(row), self.index(row), [])
+                break
+
+
+class ModRowDelegate(QStyledItemDelegate):
+    """ Paints a lightweight row for the records that have no live widget yet (e.g. during fast scrolling) """
+    def sizeHint(self, option, index: QModelIndex) -> QSize:
+        return ROW_SIZE
+
+    def paint(self, painter, option, index: QModelIndex) -> None:
+        if id(index.data(RECORD_ROLE)) in self.parent().bound_editors:  # the row is covered by its widget
+            return
+        rect = QRect(option.rect.topLeft(), ROW_SIZE)
+        painter.fillRect(rect, index.data(Qt.BackgroundRole))
+        painter.drawText(rect.adjusted(4, 10, 0, 0), Qt.AlignLeft | Qt.AlignTop, index.data(Qt.DisplayRole))
+
+
+class ModListView(QListView):
+    """ Virtualized list of mods. Only the visible rows have a live ModInfoWidget,
+        widgets are taken from a small pool and bound to the records while scrolling """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.main_window = None  # MainWindow that handles widgets' buttons
+        self.free_editors = []  # pool of hidden widgets
+        self.bound_editors = {}  # id(record): widget, widgets of the visible records
+        self.sync_timer = QTimer(self)  # several model changes in a row cause only one sync
+        self.sync_timer.setSingleShot(True)
+        self.sync_timer.timeout.connect(self.sync_editors)
+
+        self.setUniformItemSizes(True)
+        self.setSpacing(1)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.verticalScrollBar().setSingleStep(20)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setItemDelegate(ModRowDelegate(self))
+        THUMBNAIL_LOADER.loaded.connect(self.thumbnail_loaded)
+
+    def init_editors(self, main_window) -> None:
+        """ Sets the window that widgets report to """
+        self.main_window = main_window
+
+    def setModel(self, model: ModListModel) -> None:
+        super().setModel(model)
+        model.modelAboutToBeReset.connect(self.release_all_editors)
+        model.rowsAboutToBeRemoved.connect(self.release_removed_editors)
+        model.modelReset.connect(self.schedule_sync)
+        model.rowsInserted.connect(self.schedule_sync)
+        model.rowsRemoved.connect(self.schedule_sync)
+        model.layoutChanged.connect(self.schedule_sync)
+
+    def dataChanged(self, top_left: QModelIndex, bottom_right: QModelIndex, roles=()) -> None:
+        super().dataChanged(top_left, bottom_right, roles)
+        highlight_only = list(roles) == [Qt.BackgroundRole]
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            record = self.model().records[row]
+            editor = self.bound_editors.get(id(record))
+            if editor is not None:
+                if highlight_only:
+                    editor.update_highlight()
+                else:
+                    editor.bind(record)
+
+    def commit_edits(self) -> None:
+        """ Writes text of all visible widgets into their records """
+        for editor in self.bound_editors.values():
+            editor.commit_edits()
+
+    def thumbnail_loaded(self, image_path: str, image: QImage) -> None:
+        """ Swaps the placeholder of the visible widgets that wait for this picture """
+        for editor in self.bound_editors.values():
+            if editor.shown_image_path == image_path:
+                editor.show_thumbnail(image)
+
+    def schedule_sync(self, *args) -> None:
+        self.sync_timer.start(0)
+
+    def release_editor(self, key: int) -> None:
+        """ Returns the widget to the pool, keeping the typed text in its record """
+        editor = self.bound_editors.pop(key)
+        editor.commit_edits()
+        editor.record = None
+        editor.hide()
+        self.free_editors.append(editor)
+
+    def release_all_editors(self) -> None:
+        for key in list(self.bound_editors):
+            self.release_editor(key)
+
+    def release_removed_editors(self, parent: QModelIndex, first: int, last: int) -> None:
+        for record in self.model().records[first:last + 1]:
+            if id(record) in self.bound_editors:
+                self.release_editor(id(record))
+
+    def visible_rows(self) -> range:
+        """ Rows that intersect the viewport """
+        model = self.model()
+        if model is None or model.rowCount() == 0:
+            return range(0)
+        first_top = self.visualRect(model.index(0)).top()  # negative when the list is scrolled down
+        pitch = ROW_SIZE.height() + 2 * self.spacing()  # spacing is added on both sides of a row
+        first = min(max(0, -first_top // pitch), model.rowCount() - 1)
+        last = first
+        bottom = self.viewport().height()
+        while last + 1 < model.rowCount() and self.visualRect(model.index(last + 1)).top() < bottom:
+            last += 1
+        return range(first, last + 1)
+
+    @traced("widget")
+    def sync_editors(self) -> None:
+        """ Binds widgets to the visible rows and returns the others to the pool """
+        if self.main_window is None or self.model() is None:
+            return
+        records = self.model().records
+        visible = {id(records[row]): row for row in self.visible_rows()}
+        for key in [key for key in self.bound_editors if key not in visible]:
+            self.release_editor(key)
+        for key, row in visible.items():
+            editor = self.bound_editors.get(key)
+            if editor is None:
+                editor = self.free_editors.pop() if self.free_editors else ModInfoWidget(self.main_window, self.viewport())
+                editor.bind(records[row])
+                self.bound_editors[key] = editor
+            editor.move(self.visualRect(self.model().index(row)).topLeft())
+            editor.show()
+
+    def scrollContentsBy(self, dx: int, dy: int) -> None:
+        super().scrollContentsBy(dx, dy)
+        self.sync_editors()
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        self.schedule_sync()
+
+    def updateGeometries(self) -> None:
+        super().updateGeometries()
+        self.schedule_sync()
@@ -1,77 +1,25 @@
+import sqlite3
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow
-from PyQt5 import uic
+import time
+from PyQt5.QtCore import QTimer, Qt, pyqtSlot
+from PyQt5.QtWidgets import QApplication, QMainWindow, QProgressDialog
 from GameClass import *
+from ModListView import ModListView, ModListModel
+from TagIndex import TagQueryError
+from DependencyGraph import title_key
+from Database import get_database, close_databases, search_mods, find_database, INSERT_GAME
+from CompiledUi import load_ui_class
+from ModWatcher import ModWatcher
+from ModDiscovery import parse_roots
+from Tracing import TRACER, traced
 
-# ↓ SQL base design in dictionary
-SQL_BASE = {"Games": {0: ('Game_ID', 'INTEGER', 0, None, 1),
-                      1: ('Game_title', 'TEXT', 0, None, 0)},
-            "Mods": {0: ('Mod_ID', 'INTEGER', 0, None, 1),
-                     1: ('Game_ID', 'INTEGER', 0, None, 0),
-                     2: ('Title', 'TEXT', 0, None, 0),
-                     3: ('Tags', 'TEXT', 0, None, 0),
-                     4: ('Mversion', 'TEXT', 0, None, 0),
-                     5: ('Gversion', 'TEXT', 0, None, 0),
-                     6: ('Requirements', 'NUMERIC', 0, None, 0),
-                     7: ('Filepath', 'TEXT', 0, None, 0),
-                     8: ('Incompatible', 'TEXT', 0, None, 0),
-                     9: ('Commentary', 'TEXT', 0, None, 0),
-                     10: ('IMG_Path', 'TEXT', 0, None, 0)},
-            "sqlite_sequence": {0: ('name', '', 0, None, 0),
-                                1: ('seq', '', 0, None, 0)}}
-
-
-def check_database(database: str) -> bool:
-    """ Scans the database and checks if it is configured correctly """
-    try:
-        conn = sqlite3.connect(database)
-        cur = conn.cursor()
-        tables = cur.execute(""" SELECT name FROM sqlite_master WHERE type = 'table' """)
-        if len(tables.fetchall()) != 3:
-            conn.close()
-            return False
-        for table in tables.fetchall():
-            table = table[0]
-            if table in ("Games", "Mods", "sqlite_sequence"):
-                data = cur.execute(f"""PRAGMA table_info({table})""").fetchall()
-                for column_index in range(len(data)):
-                    if data[column_index][1::] != SQL_BASE[table][column_index]:
-                        print("ERROR")
-                        conn.close()
-                        return False
-        conn.close()
-        return True
-    except Exception as e:
-        print(e)
-        return False
+Ui_MainWindow = load_ui_class('MMT.ui')  # one layout for all languages, its texts come from localization.json
 
 
 def create_database():
-    """ Creates new database """
+    """ Creates new database, its tables are made by the schema migrations (see Database.py) """
     try:
-        conn = sqlite3.connect('MMT_workbase.sqlite')
-        cur = conn.cursor()
-        cur.execute(""" CREATE TABLE "Games" (
-                            "Game_ID"	INTEGER,
-                            "Game_title"	TEXT,
-                            PRIMARY KEY("Game_ID" AUTOINCREMENT)
-                        ); """)
-        cur.execute(""" CREATE TABLE "Mods" (
-                            "Mod_ID"	INTEGER,
-                            "Game_ID"	INTEGER,
-                            "Title"	TEXT,
-                            "Tags"	TEXT,
-                            "Mversion"	TEXT,
-                            "Gversion"	TEXT,
-                            "Requirements"	NUMERIC,
-                            "Filepath"	TEXT,
-                            "Incompatible"	TEXT,
-                            "Commentary"	TEXT,
-                            "IMG_Path"	TEXT,
-                            PRIMARY KEY("Mod_ID" AUTOINCREMENT)
-                        );""")
-        conn.commit()
-        conn.close()
+        get_database('MMT_workbase.sqlite').connection()  # the app keeps using this connection
     except Exception as e:
         print(e)
 
@@ -90,40 +38,30 @@ class CrashWindow(QMainWindow):
         self.crash_info.resize(400, 30)
 
 
-class MainWindow(QMainWindow):
+class MainWindow(QMainWindow, Ui_MainWindow):
     """ Application's main window """
-    def __init__(self, database: tuple):
+    def __init__(self, database: tuple, prefetch: bool = True):
         super().__init__()
 
+        self.lang = SETTINGS.get_lang()  # config and localization are shared with the widgets (AppSettings)
+        self.setupUi(self)
         try:
-            self.lang = open("config.txt", "r").readline().split(" = ")[-1]
-        except Exception as error:
-            print("Config.txt file error: ", error)
-            self.lang = "EN"
-            config_file = open("config.txt", "w")
-            print("lang = EN", end="", file=config_file)
-            config_file.close()
-
-        try:
-            self.localization = json.load(open("localization.json", encoding="utf-8"))
+            SETTINGS.load_localization()
         except FileNotFoundError:
-            uic.loadUi('MMT_EN.ui', self)
             crash = CrashWindow()
             crash.crash_info.setText("No localization file (localization.json). Download it from github to the root folder")
             self.show()
             crash.show()
             sys.exit(app.exec())
 
-        self.window_localization = self.localization[self.lang]["MainWindow"]
-        self.errors_notes = self.localization[self.lang]["Errors/Notes"]
+        self.window_localization = SETTINGS.section("MainWindow")
+        self.errors_notes = SETTINGS.section("Errors/Notes")
+        self.translate_ui()
         if self.lang == "RU":
-            uic.loadUi('MMT_RU.ui', self)
             self.RULang.setChecked(True)
-            self.game_label = "Игра:"
         else:
-            uic.loadUi('MMT_EN.ui', self)
             self.ENLang.setChecked(True)
-            self.game_label = "Game:"
+        self.game_label = self.window_localization["gameModsLabel"]
         self.database_name = database[0]
         if database[1]:  # new database
             self.informationText.setText(self.errors_notes["new_database"])
@@ -132,7 +70,23 @@ class MainWindow(QMainWindow):
         self.games = []  # list of 'Game' classes
         self.chosen_game = None  # currently opened game
         self.chosen_game_button = None  # it's ↑ button in QT gamesVLayout
-        self.import_games()  # get all games and mods from the database
+        self.mod_filter = ""  # sort of the opened mods ('alphabetical', 'supported_version'), the search keeps it
+        self.widget_localization = SETTINGS.section("ModInfoWidget")
+        self.modsModel = ModListModel(self)  # records of the opened game, only visible ones get a widget
+        self.modsView.setModel(self.modsModel)
+        self.modsView.init_editors(self)
+        self.prefetcher = None  # thread that imports mods of the other games after the window is shown
+        self.folder_scanner = None  # thread that parses mods of the folder chosen by folder_mods
+        self.scan_game = None  # game that gets mods from the folder_scanner
+        self.scan_progress = None
+        self.manifest = DescriptorManifest.for_database(self.database_name)  # descriptors of the updated mods
+        self.watcher = ModWatcher(self.database_name, self.manifest, self)  # live updates of the loaded games' mods
+        self.watcher.applying.connect(self.modsView.commit_edits)
+        self.watcher.applied.connect(self.watched_changes)
+        self.watcher.watch_roots(SETTINGS.get("watch_roots").split(";"))  # 'watch_roots = folder;folder' in config.txt
+        self.import_games()  # get all games from the database, mods are imported when the game is opened
+        if prefetch:
+            QTimer.singleShot(0, self.prefetch_games)
 
         if len(self.games) > 0:
             self.game_name_is_set = True  # variable that controls app's functionality (it's shortened until user will name recently created game)
@@ -155,6 +109,18 @@ class MainWindow(QMainWindow):
         self.requiredButton.clicked.connect(self.relation_highlight)
         self.saveAllMods.clicked.connect(self.save_all)
         self.updateAllMods.clicked.connect(self.update_all)
+        self.search_timer = QTimer(self)  # the list is filtered when user stops typing
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.search)
+        self.searchEdit.textChanged.connect(self.search_timer.start)
+
+    def translate_ui(self) -> None:
+        """ Sets texts of the layout widgets in the app language. Keys are widget names, 'name.property' is used
+            for the properties other than text (e.g. placeholderText) """
+        for key, text in SETTINGS.section("MainWindowUi").items():
+            widget_name, _, widget_property = key.partition(".")
+            getattr(self, widget_name).setProperty(widget_property or "text", text)
 
     def activate_mod_filter_buttons(self):
         """ Activates/disables all mod_filter group buttons """
@@ -164,10 +130,11 @@ class MainWindow(QMainWindow):
             else:
                 button.setEnabled(False)
 
+    @traced("ui")
     def clear_layout(self):
-        """ Makes the mods' layout empty. Deletes all widgets one by one """
-        while self.modsVLayout.count() > 0:
-            self.modsVLayout.itemAt(0).widget().setParent(None)
+        """ Makes the mods' list empty. Widgets return to the pool of the view, pictures that are still loading are dropped """
+        THUMBNAIL_LOADER.cancel_pending()
+        self.modsModel.set_records([])
 
     def update_number_of_saved_mods(self):
         """ Updates the number of saved mods in savedModsNumberLabel """
@@ -180,6 +147,7 @@ class MainWindow(QMainWindow):
 
     def switch_language(self):
         """ Writes chosen language in the config file """
+        SETTINGS.switch_language(self.sender().text())  # config file is rewritten only if the language has changed
         if self.lang == self.sender().text():  # if current language == button of this language, no info displayed
             self.informationText.setText("")
         elif self.sender() == self.ENLang:
@@ -187,31 +155,47 @@ class MainWindow(QMainWindow):
         elif self.sender() == self.RULang:
             self.informationText.setText("Вы сменили язык на русский. Перезагрузите приложение")
 
-        print(f"lang = {self.sender().text()}", end="", file=open("config.txt", "w"))  # config file rewritten with chosen language
-
+    @traced("ui")
     def import_games(self) -> None:
-        """ Retrieves info from the database and creates game classes along with buttons """
-        con = connect_base(self.database_name, self.lang)
-        if type(con) == sqlite3.Connection:
-            cur = con.cursor()
-            games = cur.execute("""SELECT * FROM Games""").fetchall()
-        else:
-            self.informationText.setText(con)
+        """ Retrieves info from the database and creates game classes along with buttons. Mods aren't imported here """
+        games = load_games(self.database_name)
+        if type(games) == str:  # connection error
+            self.informationText.setText(games)
             return
 
-        for game in games:
-            new_game_button = QPushButton(game[1], self)  # game button ↓
+        for imported_game in games:
+            new_game_button = QPushButton(imported_game.title, self)  # game button ↓
             self.gamesVLayout.insertWidget(0, new_game_button)  # in a layout
             new_game_button.clicked.connect(self.open_mods)  # if clicked execute this function
             self.games_counter += 1
-            # self.game_name_is_set = False
-            imported_game = Game(new_game_button)  # game class
-            imported_game.title = game[1]
-            imported_game.id = game[0]
-            imported_game.import_mods(self.database_name, self)
+            imported_game.button = new_game_button
             self.games.append(imported_game)
             self.games_titles_list.append(imported_game.title)
 
+    def prefetch_games(self) -> None:
+        """ Starts background import of mods of all games that haven't been opened yet """
+        game_ids = [game.id for game in self.games if not game.loaded and game.id is not None]
+        if game_ids:
+            self.prefetcher = GamesPrefetcher(self.database_name, game_ids, self)
+            self.prefetcher.game_loaded.connect(self.prefetched_game)
+            self.prefetcher.start()
+
+    def prefetched_game(self, game_id: int, mods: list) -> None:
+        """ Gives prefetched mods to the game, unless the game has been opened (and loaded) meanwhile """
+        for game in self.games:
+            if game.id == game_id and not game.loaded:
+                game.set_mods(mods)  # it is watched when it is opened (a folder read per mod, too slow for startup)
+                break
+
+    def closeEvent(self, event) -> None:
+        if self.prefetcher is not None:
+            self.prefetcher.requestInterruption()
+            self.prefetcher.wait()
+        if self.folder_scanner is not None:
+            self.folder_scanner.cancel()
+            self.folder_scanner.wait()
+        super().closeEvent(event)
+
     def rename_game_button(self):
         """ Renames game in the database and in the application """
         if not self.game_name_is_set:
@@ -237,6 +221,7 @@ class MainWindow(QMainWindow):
         new_game_button.clicked.connect(self.open_mods)
         self.games.append(Game(new_game_button))
         self.chosen_game = self.games[-1]
+        self.chosen_game.loaded = True  # new game has no mods in the database
         # self.renameGameButton.setEnabled(False)  # no new game can be added
         self.createGameButton.setEnabled(False)  # no new game can be added
         self.game_name_is_set = False  # disable app, wait for add_game_button func
@@ -250,24 +235,19 @@ class MainWindow(QMainWindow):
             return
 
         if self.chosen_game.button and not self.game_name_is_set:
-            con = connect_base(self.database_name, self.lang)
-            if type(con) == sqlite3.Connection:
-                cur = con.cursor()
+            con = connect_base(self.database_name)
+            if isinstance(con, sqlite3.Connection):
                 if game_title not in self.games_titles_list:
                     self.chosen_game.button.setText(game_title)
                     self.createGameButton.setEnabled(True)  # new game can be added
                     # self.renameGameButton.setEnabled(True)
                     self.game_name_is_set = True  # app is now functional
-                    cur.execute('''INSERT INTO Games(Game_title) VALUES(?)''', (game_title,))  # add to database
-                    game_id = cur.execute(""" SELECT GAME_ID FROM Games
-                                              WHERE Game_title == ? """, (game_title,)).fetchone()
-                    self.chosen_game.id = game_id[0]
+                    self.chosen_game.id = con.execute(INSERT_GAME, (game_title,)).lastrowid  # add to database
                     self.informationText.clear()
                     self.games[-1].title = game_title
                     self.open_mods(new_game=self.chosen_game)
                     self.games_counter += 1
                     con.commit()
-                    con.close()
                 else:
                     self.informationText.setText(f"'{game_title}' {self.errors_notes['same_game_title']}")
             else:
@@ -275,22 +255,21 @@ class MainWindow(QMainWindow):
 
     def delete_game(self) -> None:
         """ Deletes the game from the database and all related widgets and button from the app """
-        con = connect_base(self.database_name, self.lang)
-        if type(con) != sqlite3.Connection:
-            self.informationText.setText(self.errors_notes['base_connection_failure_when_deleting_game'])
-            return
-
         if not self.game_name_is_set:
             self.informationText.setText(self.errors_notes['finish_game_init'])
             return
 
-        for mod in self.chosen_game.mods:  # delete all game mods from the database and widgets from the layout
-            mod.delete()
-
-        cur = con.cursor()
-        cur.execute("""DELETE from Games WHERE Game_Title = ?""", (self.chosen_game.title,))  # query to delete game
-        con.commit()
-        con.close()
+        deleted_ids = [mod.mod_id for mod in self.chosen_game.mods if mod.saved]
+        if not self.chosen_game.delete(self.database_name):  # the game and all its mods in one transaction
+            self.informationText.setText(self.errors_notes['base_connection_failure_when_deleting_game'])
+            return
+        for mod_id in deleted_ids:
+            self.manifest.forget(mod_id)
+        self.manifest.save()
+        self.watcher.unwatch_game(self.chosen_game)
+        self.clear_layout()
+        self.update_number_of_saved_mods()
+        self.gameModsNumberLabel.setText(self.window_localization['gameModsNumberLabel'] + "0")
         if self.chosen_game.button:
             self.chosen_game.button.setParent(None)
         for i in range(len(self.games)):  # pop class from self.games list
@@ -301,8 +280,9 @@ class MainWindow(QMainWindow):
         self.gameModsLabel.setText(f"{self.game_label} ")
         self.games_counter -= 1
 
+    @traced("ui")
     def open_mods(self, new_game: bool = None, mod_filter: str = "") -> None:
-        """ Creates a ModInfoWidget for each mod of the game """
+        """ Shows mods of the game in the mods' list """
         if type(new_game) == Game:  # game button that associates with mods
             clicked_button = new_game.button
         elif mod_filter != "":
@@ -318,28 +298,59 @@ class MainWindow(QMainWindow):
         for game in self.games:
             if game.button == clicked_button:
                 self.chosen_game = game
+                self.chosen_game.load_mods(self.database_name)  # the first time the game is opened
+                self.watcher.watch_game(self.chosen_game)
                 self.gameModsLabel.setText(f"{self.game_label} {self.chosen_game.title}")
+                self.mod_filter = mod_filter
 
                 if mod_filter == "alphabetical":  # check for filters
                     mods = sorted(self.chosen_game.mods, key=lambda x: x.title)
-                elif mod_filter == "supported_version":
-                    mods = sorted(self.chosen_game.mods, key=lambda x: x.supported_game_version, reverse=True)
+                elif mod_filter == "supported_version":  # newest first, mods without a version at the end
+                    version_index = self.chosen_game.version_index
+                    mods = version_index.sorted_mods()[::-1] + version_index.without_version()
                 else:
                     mods = self.chosen_game.mods
 
-                for mod in mods:
-                    try:
-                        mod.set_image(mod.image_path)
-                    except Exception as fail:
-                        print(mod.title, fail)
-                        self.informationText.setText(self.errors_notes['image_import_failure'])  # text instead picture
-                    self.modsVLayout.addWidget(mod)  # new widget with mod info
+                found_ids = self.search_results()  # None if the search box is empty
+                if found_ids is not None and mod_filter:
+                    mods = [mod for mod in mods if mod.mod_id in found_ids]
+                elif found_ids is not None:  # the best matches first
+                    mods = [mod for mod in map(self.chosen_game.mod_by_id, found_ids) if mod is not None]
+
+                self.modsModel.set_records(mods)  # widgets are created only for the visible mods
+                self.modsView.scrollToTop()
 
                 self.activate_mod_filter_buttons()
                 self.gameModsNumberLabel.setText(self.window_localization['gameModsNumberLabel'] + str(len(self.chosen_game.mods)))
                 self.update_number_of_saved_mods()
                 break
 
+    def search_results(self) -> Optional[dict]:
+        """ Searches saved mods of all games by the text of the search box (title, tags and commentary, every word
+            is a prefix). Returns {Mod_ID: None} of the chosen game's mods in the order of relevance,
+            None if the search box is empty """
+        text = self.searchEdit.text().strip()
+        if not text:
+            return None
+        con = connect_base(self.database_name)
+        if not isinstance(con, sqlite3.Connection):
+            self.informationText.setText(con)
+            return None
+        try:
+            found_mods = search_mods(con, text)
+        except sqlite3.Error as error:
+            print(error)
+            return None
+        found_ids = {mod_id: None for mod_id, game_id in found_mods if game_id == self.chosen_game.id}
+        self.informationText.setText(self.errors_notes["search_results"].format(len(found_ids), len(found_mods) - len(found_ids)))
+        return found_ids
+
+    @traced("ui")
+    def search(self) -> None:
+        """ Shows only the mods that match the search box (all mods if it is empty) """
+        if self.chosen_game and self.game_name_is_set:
+            self.open_mods(self.chosen_game, self.mod_filter)
+
     def add_blank_mod_widget(self):
         """ Adds new blank mod widget in the app (it's not saved in database yet) """
         if not self.game_name_is_set:
@@ -347,10 +358,9 @@ class MainWindow(QMainWindow):
             return
 
         if self.chosen_game:
-            new_widget = ModInfoWidget(self.chosen_game, self)
-            new_widget.game_id += self.chosen_game.id
-            self.modsVLayout.addWidget(new_widget)
-            self.chosen_game.mods += [new_widget]
+            new_mod = ModRecord.blank(self.chosen_game.id, self.widget_localization)
+            self.chosen_game.add_mod(new_mod)
+            self.modsView.scrollTo(self.modsModel.append_record(new_mod))
             self.informationText.setText(self.window_localization["blank_widget_added"] + self.chosen_game.title)
             self.activate_mod_filter_buttons()
             self.gameModsNumberLabel.setText(self.window_localization['gameModsNumberLabel'] + str(len(self.chosen_game.mods)))
@@ -368,69 +378,16 @@ class MainWindow(QMainWindow):
                 descriptor_file_path = QFileDialog.getOpenFileName(self, self.window_localization["file_dialog_desc"], ".",
                                                                    self.window_localization["file_dialog_type"])[0]
             if descriptor_file_path:
-                with open(descriptor_file_path, encoding="UTF8") as descriptor_file:  # file parsing (for now only paradox games descriptor type)
-                    new_widget = ModInfoWidget(self.chosen_game, self)
-                    new_widget.clear_args()
-                    braces = False  # bool to check braces were opened before
-                    braces_content = ''
-                    image_file = 1  # image file name
-                    for i in descriptor_file.readlines():  # read all lines in the file
-                        if '=' in i or '\t' in i or '}' in i:
-                            if not braces:  # get key and value, they are divided by '='
-                                key = i[:i.index('=')].strip()
-                                if '#' in i:
-                                    value = i[i.index('=') + 1:i.index('#')].strip('"\n ')
-                                else:
-                                    value = i[i.index('=') + 1::].strip('"\n ')
-                            else:
-                                braces_content = i.strip('\t\n"')
-
-                            if key == 'name' or key == 'title':  # check key and set value for this key in the widget
-                                new_widget.title = value
-                            elif (key == 'tags' or key == 'dependencies') and not braces:
-                                braces = True
-                            elif '}' in i and braces is True:  # braces end
-                                braces = False
-                            elif braces is True and key == 'tags':  # keys for braces
-                                new_widget.tags.append(braces_content)
-                            elif braces is True and key == 'dependencies':
-                                new_widget.required_mods.append(braces_content)
-                            elif key == 'version':
-                                new_widget.mod_version = value
-                            elif key == 'supported_version':
-                                new_widget.supported_game_version = value
-                            elif key == 'path' or key == 'archive':
-                                if path.exists(value):  # check if filepath exists
-                                    new_widget.filepath = value
-                                else:
-                                    new_widget.filepath = descriptor_file_path[:descriptor_file_path.rfind("/")]
-                            elif key == 'picture' or key == 'poster':
-                                image_file = value
-
-                    if not new_widget.title:  # check condition (has title and doesn't exist in base) for mod creation
+                new_mod = read_mod(descriptor_file_path)  # file parsing (for now only paradox games descriptor type)
+                if new_mod:  # check condition (has title and doesn't exist in base) for mod creation
+                    new_mod.game_id = self.chosen_game.id
+                    if self.chosen_game.find_mod(new_mod.title, new_mod.filepath):  # mod with same title and path is already added
+                        self.informationText.setText(self.errors_notes["mod_is_already_added"])
                         return
-                    for mod in self.chosen_game.mods:  # check if mod with same title and path already in the database
-                        if mod.filepath == new_widget.filepath and mod.title == new_widget.title and mod.game_id != -1:
-                            self.informationText.setText(self.errors_notes["mod_is_already_added"])
-                            return
-
-                    if new_widget.filepath == '':
-                        new_widget.filepath = descriptor_file_path[:descriptor_file_path.rfind("/")]  # descriptor file folder
-                    new_widget.initUI()
-                    if image_file != 1 and new_widget.filepath != '':  # path for image file
-                        image_path = new_widget.filepath + '/' + image_file
-                        new_widget.set_image(image_path)
-                    else:
-                        for file in listdir(new_widget.filepath):  # look for some image files in the mod folder
-                            if file.endswith((".png", ".jpg")):
-                                image_path = new_widget.filepath + '/' + file
-                                new_widget.set_image(image_path)
-                                break
-
-                    new_widget.game_id = self.chosen_game.id
-                    self.modsVLayout.addWidget(new_widget)
-                    self.chosen_game.mods += [new_widget]
-                    self.informationText.setText(self.chosen_game.title + self.errors_notes["new_mod_is_added"] + new_widget.title)
+
+                    self.chosen_game.add_mod(new_mod)
+                    self.modsModel.append_record(new_mod)
+                    self.informationText.setText(self.chosen_game.title + self.errors_notes["new_mod_is_added"] + new_mod.title)
                     self.gameModsNumberLabel.setText(self.window_localization['gameModsNumberLabel'] + str(len(self.chosen_game.mods)))
                     self.activate_mod_filter_buttons()
             else:
@@ -438,6 +395,8 @@ class MainWindow(QMainWindow):
         else:
             self.informationText.setText(self.errors_notes["choose_game_to_add_mod"])
 
+    @pyqtSlot()
+    @traced("ui")
     def folder_mods(self):
         """ Parses the folder """
         if not self.game_name_is_set:
@@ -445,121 +404,238 @@ class MainWindow(QMainWindow):
             return
 
         if self.chosen_game:  # folder dialogue
-            folder_path = QFileDialog.getExistingDirectory(None, self.window_localization["folder_dialog_desc"])
-            try:
-                folder = listdir(folder_path)
-            except Exception as error:
+            roots = parse_roots(SETTINGS.get("library_roots"))  # 'library_roots = folder;folder', the dialog starts in the first one
+            folder_path = QFileDialog.getExistingDirectory(None, self.window_localization["folder_dialog_desc"], roots[0] if roots else "")
+            if not folder_path:
                 self.informationText.setText(self.errors_notes["no_mod_selected"])
-                print(error)
                 return
-            for data in folder:
-                if data.count(".") == 0:  # folder contains only folders
-                    for mod_data in listdir(folder_path + "/" + data):  # parse new folder
-                        if mod_data.endswith((".mod", ".txt")):
-                            try:
-                                self.add_mod_with_info(folder_path + "/" + data + "/" + mod_data)
-                                print("++++++++++++++", folder_path,  data, mod_data, self.chosen_game.mods[-1].title)
-                            except Exception as fail:
-                                print("--------------", mod_data, fail)
-                            if mod_data.endswith(".mod"):  # that's definitely enough
-                                break
-                else:  # some files
-                    if data.endswith((".mod", ".txt")):
-                        try:
-                            self.add_mod_with_info(folder_path + "/" + data)
-                            print("++++++++++++++", folder_path, data, self.chosen_game.mods[-1].title)
-                        except Exception as fail:
-                            print("--------------", data, fail)
-            self.informationText.setText(self.errors_notes["mods_from_folder"] + folder_path)
+            self.scan_game = self.chosen_game  # mods are added to this game even if another one is opened meanwhile
+            self.scan_progress = QProgressDialog(self.window_localization["scan_progress"], self.window_localization["scan_cancel"], 0, 0, self)
+            self.scan_progress.setWindowModality(Qt.WindowModal)
+            self.scan_progress.setMinimumDuration(500)
+            self.folder_scanner = FolderScanner(folder_path, self)  # descriptors are parsed on a thread pool
+            self.folder_scanner.progress.connect(self.folder_scan_progress)
+            self.folder_scanner.scanned.connect(self.add_scanned_mods)
+            self.folder_scanner.failed.connect(self.folder_scan_failed)
+            self.folder_scanner.finished.connect(self.scan_progress.reset)
+            self.scan_progress.canceled.connect(self.folder_scanner.cancel)
+            self.folder_scanner.start()
+        else:
+            self.informationText.setText(self.errors_notes["choose_game_to_add_mod"])
 
-    def tag_highlight(self):
-        """ Changes widget frame color, green highlight means mod has searched tag """
-        for mod in self.chosen_game.mods:  # read all mods tags
-            mod_tags, searched_tags = mod.tags.split(','), self.tagsEdit.text().split(',')
-            flag = True
-            for j in searched_tags:
-                if j.strip() in mod_tags:
-                    mod.frame.setStyleSheet("background-color: rgb(40, 175, 40)")  # change widget frame color to green
-                    flag = False
-                    break
-            if flag:
-                mod.frame.setStyleSheet("background-color: rgb(100, 150, 220)")
+    def folder_scan_progress(self, done: int, total: int) -> None:
+        self.scan_progress.setMaximum(total)
+        self.scan_progress.setValue(done)
+
+    def folder_scan_failed(self, error: str) -> None:
+        print(error)
+        self.informationText.setText(self.errors_notes["no_mod_selected"])
+
+    @traced("ui")
+    def add_scanned_mods(self, records: list, failures: list) -> None:
+        """ Adds all mods found by the FolderScanner to the game in one batch """
+        game = self.scan_game
+        for descriptor, fail in failures:
+            print("--------------", descriptor, fail)
+        if self.folder_scanner.cancel_event.is_set():
+            self.informationText.setText(self.errors_notes["scan_cancelled"])
+            return
 
+        new_mods = []
+        for new_mod in records:
+            if not game.find_mod(new_mod.title, new_mod.filepath):  # mod with same title and path is already added
+                new_mod.game_id = game.id
+                game.add_mod(new_mod)
+                new_mods.append(new_mod)
+        if game is self.chosen_game:
+            self.modsModel.append_records(new_mods)
+            self.gameModsNumberLabel.setText(self.window_localization['gameModsNumberLabel'] + str(len(game.mods)))
+            self.activate_mod_filter_buttons()
+        self.informationText.setText(self.errors_notes["mods_from_folder"] + self.folder_scanner.folder_path)
+
+    @pyqtSlot()
+    @traced("ui")
+    def tag_highlight(self):
+        """ Changes widget frame color, green highlight means mod matches the tag query ('Map, Balance' or
+            'Map AND NOT Graphics'), only the mods whose highlight has changed are restyled """
+        if not self.chosen_game:
+            self.informationText.setText(self.errors_notes["choose_game_to_add_mod"])
+            return
+        self.modsView.commit_edits()  # tags typed in the visible widgets
+        try:
+            found_mods = self.chosen_game.tag_index.search(self.tagsEdit.text())
+        except TagQueryError as error:
+            self.informationText.setText(self.errors_notes["wrong_tag_query"] + str(error))
+            return
+        changed_mods = []
+        for mod in self.chosen_game.mods:
+            highlight = "background-color: rgb(40, 175, 40)" if mod in found_mods else ""  # green frame
+            if mod.highlight != highlight:
+                mod.highlight = highlight
+                changed_mods.append(mod)
+        self.modsModel.refresh_records(changed_mods, highlight_only=True)
+
+    @pyqtSlot()
+    @traced("ui")
     def ver_highlight(self):
-        """ Changes widget frame color, green highlight means mod supports searched game version """
+        """ Changes widget frame color, green highlight means mod supports searched game version ('1.9.3', '1.9.*',
+            '>=1.8 <1.10', see GameVersion.py), only the mods whose highlight has changed are restyled """
+        if not self.chosen_game:
+            self.informationText.setText(self.errors_notes["choose_game_to_add_mod"])
+            return
+        self.modsView.commit_edits()  # versions typed in the visible widgets
+        found_mods = self.chosen_game.version_index.compatible(self.gameVersionEdit.text())
+        if found_mods is None:
+            self.informationText.setText(self.errors_notes["wrong_game_version"] + self.gameVersionEdit.text())
+            return
+        changed_mods = []
         for mod in self.chosen_game.mods:
-            mod_version, game_version = mod.supported_game_version, self.gameVersionEdit.text()
-            if mod_version == game_version:
-                mod.frame.setStyleSheet("background-color: rgb(40, 175, 40)")  # change widget frame color to green
-            else:
-                mod.frame.setStyleSheet("background-color: rgb(100, 150, 220)")
-
+            highlight = "background-color: rgb(40, 175, 40)" if mod in found_mods else ""  # green frame
+            if mod.highlight != highlight:
+                mod.highlight = highlight
+                changed_mods.append(mod)
+        self.modsModel.refresh_records(changed_mods, highlight_only=True)
+
+    @pyqtSlot()
+    @traced("ui")
     def relation_highlight(self):
         """ Changes widget frame color,
-         green highlight means that searched mod depends on another one or needed for another one (mutual highlight),
-         red highlight means that this mod is incompatible for another one or incompatible for searched one (mutual highlight) """
+         green highlight means that searched mod needs another one or is needed for another one, directly or through
+         other mods, red highlight means that this mod and searched one are incompatible (either of them says so).
+         Shows load order of searched mod and its requirements, missing requirements and requirement cycles """
         mod_title = self.gameNameEdit.text().strip()
-        searched_mod = None
-
-        for mod in self.chosen_game.mods:  # find this title in our mods
-            if mod.title == mod_title:
-                searched_mod = mod
-                break
+        if not self.chosen_game or title_key(mod_title) not in self.chosen_game.dependency_graph.mods_by_key:
+            self.informationText.setText(self.errors_notes["choose_game_to_add_mod"])
+            return
 
-        if searched_mod:  # get info about required_mods and forbidden_mods
-            required_mods = [i.strip() for i in searched_mod.required_mods.split(",")]
-            forbidden_mods = [i.strip() for i in searched_mod.incompatible_mods.split(",")]
-            for mod in self.chosen_game.mods:
-                if mod_title in mod.incompatible_mods or mod.title in forbidden_mods:
-                    mod.frame.setStyleSheet("background-color: rgb(175, 40, 40)")  # change widget frame color to red
-                elif mod_title in mod.required_mods or mod.title in required_mods:
-                    mod.frame.setStyleSheet("background-color: rgb(40, 175, 40)")  # change widget frame color to green
-                else:
-                    mod.frame.setStyleSheet("background-color: rgb(100, 150, 220)")
+        self.modsView.commit_edits()  # relations typed in the visible widgets
+        graph = self.chosen_game.dependency_graph
+        requirements = graph.requirements(mod_title)
+        related_mods = requirements | graph.dependents(mod_title)
+        incompatible_mods = graph.incompatibilities(mod_title)
+        changed_mods = []
+        for mod in self.chosen_game.mods:
+            key = title_key(mod.title)
+            if key in incompatible_mods:
+                highlight = "background-color: rgb(175, 40, 40)"  # change widget frame color to red
+            elif key in related_mods:
+                highlight = "background-color: rgb(40, 175, 40)"  # change widget frame color to green
+            else:
+                highlight = ""
+            if mod.highlight != highlight:
+                mod.highlight = highlight
+                changed_mods.append(mod)
+        self.modsModel.refresh_records(changed_mods, highlight_only=True)
+
+        load_order, cycled_mods = graph.load_order([mod_title])
+        info = [self.errors_notes["load_order"] + " → ".join(graph.title(key) for key in load_order)]
+        missing_mods = sorted(graph.title(key) for key in requirements if key not in graph.mods_by_key)
+        if missing_mods:
+            info.append(self.errors_notes["missing_mods"] + ", ".join(missing_mods))
+        if cycled_mods:
+            info.append(self.errors_notes["cycled_mods"] + ", ".join(graph.title(key) for key in cycled_mods))
+        self.informationText.setText("\n".join(info))
+
+    def save_mod(self, mod: ModRecord) -> str:
+        """ Saves one mod of the chosen game (save button of the mod widget). Returns title of the mod if it wasn't saved """
+        not_saved_mod = self.chosen_game.save_mod(mod, self.database_name)
+        if not_saved_mod:
+            self.informationText.setText("'" + mod.title + "'" + self.errors_notes["same_mod_title"])
         else:
-            self.informationText.setText(self.errors_notes["choose_game_to_add_mod"])
+            self.informationText.setText("'" + mod.title + "' " + self.widget_localization['saved'])
+            self.update_number_of_saved_mods()
+            self.watcher.watch_mods(self.chosen_game, [mod])
+        self.modsModel.refresh_record(mod)
+        return not_saved_mod
+
+    def update_mod(self, mod: ModRecord, descriptor_file_path: str, images: tuple = None) -> str:
+        """ Updates one mod from its descriptor file (update button of the mod widget) """
+        not_updated_mod = self.chosen_game.update_mod(mod, self.database_name, descriptor_file_path, images)
+        self.manifest.forget(mod.mod_id)  # 'update all' checks the descriptor again
+        self.manifest.save()
+        if not_updated_mod:
+            self.informationText.setText("'" + mod.title + "'" + self.errors_notes["same_mod_title"])
+        else:
+            self.update_number_of_saved_mods()
+        self.modsModel.refresh_record(mod)
+        return not_updated_mod
+
+    def delete_mod(self, mod: ModRecord) -> None:
+        """ Deletes the mod from the database and from the list (delete button of the mod widget) """
+        if not self.chosen_game.delete_mod(mod, self.database_name):
+            self.informationText.setText(self.errors_notes['base_connection_failure'])
+            return
+        self.manifest.forget(mod.mod_id)
+        self.manifest.save()
+        self.modsModel.remove_record(mod)
+        self.update_number_of_saved_mods()
+        self.informationText.setText("'" + mod.title + "' " + self.widget_localization['mod_deleted'])
+        self.gameModsNumberLabel.setText(self.window_localization['gameModsNumberLabel'] + str(len(self.chosen_game.mods)))
+        if len(self.chosen_game.mods) < 2:
+            self.activate_mod_filter_buttons()
 
+    @pyqtSlot()
+    @traced("ui")
     def save_all(self):
         """ Saves all mods of the chosen game """
         if self.chosen_game:
-            not_saved_mods = []  # stores titles of all unsaved mods
-            for mod in self.chosen_game.mods:
-                if mod.game_id != -1:  # check if mod deleted (legacy, 'cause program pop all deleted games from the list)
-                    not_saved_mod = mod.save_into_base()
-                    if not_saved_mod:
-                        not_saved_mods.append(not_saved_mod)
+            self.modsView.commit_edits()  # text typed in the visible widgets
+            not_saved_mods = self.chosen_game.save_mods(self.database_name)  # titles of all unsaved mods
+            self.watcher.watch_game(self.chosen_game)
+            self.modsModel.refresh()
+            self.update_number_of_saved_mods()
             if len(not_saved_mods) > 0:
                 self.informationText.setText(self.errors_notes["not_saved_mods"] + ";\n".join(not_saved_mods))
             else:
                 self.informationText.setText(self.errors_notes["all_saved_mods"])
 
+    @pyqtSlot()
+    @traced("ui")
     def update_all(self):
-        """ Updates all mods of the chosen game """
-        if self.chosen_game:  # stores titles of all unsaved mods
-            not_updated_mods = []
-            for mod in self.chosen_game.mods:
-                if mod.game_id != -1:  # check if mod deleted (legacy, 'cause program pop all deleted games from the list)
-                    not_updated_mod = mod.update_mod_data(True)  # True means we're updating all mods, not some specific one
-                    if not_updated_mod:
-                        not_updated_mods.append(not_updated_mod)
-            if len(not_updated_mods) > 0:
-                self.informationText.setText(self.errors_notes["not_updated_mods"] + ";\n".join(not_updated_mods))
+        """ Updates mods of the chosen game whose descriptors have changed since the last update """
+        if self.chosen_game:
+            self.modsView.commit_edits()
+            report = self.chosen_game.update_mods(self.database_name, self.manifest)
+            if len(report.not_updated) > 0:
+                text = self.errors_notes["not_updated_mods"] + ";\n".join(report.not_updated)
             else:
-                self.informationText.setText(self.errors_notes["all_updated_mods"])
-            self.open_mods(self.chosen_game)  # refresh widgets
+                text = self.errors_notes["all_updated_mods"]
+            self.informationText.setText(text + "\n" + self.errors_notes["update_report"].format(*report[:3]))
+            self.watcher.watch_game(self.chosen_game)
+            self.modsModel.refresh()  # widgets show the updated records, the reset below keeps their text
+            self.open_mods(self.chosen_game)
+
+    @traced("ui")
+    def watched_changes(self, game: Game, report: UpdateReport, new_mods: list, missing_folders: list) -> None:
+        """ Shows the changes of the mod folders that the watcher has written to the database """
+        info = [self.errors_notes["watched_changes"].format(game.title, report.written - len(new_mods), len(new_mods))]
+        if report.not_updated:
+            info.append(self.errors_notes["not_updated_mods"] + ";\n".join(report.not_updated))
+        if missing_folders:
+            info.append(self.errors_notes["missing_folders"] + ";\n".join(missing_folders))
+        self.informationText.setText("\n".join(info))
+        self.update_number_of_saved_mods()
+        if game is self.chosen_game:
+            if new_mods:
+                self.modsModel.append_records(new_mods)
+                self.gameModsNumberLabel.setText(self.window_localization['gameModsNumberLabel'] + str(len(game.mods)))
+                self.activate_mod_filter_buttons()
+            self.modsModel.refresh()
 
 
 if __name__ == "__main__":
-    database_name = ""
-    for file in listdir('.'):  # parse folder to find any database files
-        if file.endswith((".db", ".sqlite", ".db3", ".sqlite3", ".s3db", ".sl3")):
-            if check_database(file):  # if this base is configured correctly for the app then it will be the app database
-                database_name = (file, 0)  # 0 means old database
-                break
-    if not database_name:
+    start_time = time.perf_counter()
+    TRACER.enable(SETTINGS.get("trace"))  # 'trace = 1' in config.txt, MMT_TRACE=1 works too (see Tracing.py)
+    database_name = find_database()  # a base of any app version will be the app database, it is upgraded when opened
+    if database_name:
+        database_name = (database_name, 0)  # 0 means old database
+    else:
         create_database()
         database_name = ("MMT_workbase.sqlite", 1)  # 1 means new database
     app = QApplication(sys.argv)
     k = MainWindow(database_name)
     k.show()
-    sys.exit(app.exec())
+    print(f"Startup time: {time.perf_counter() - start_time:.3f} s")
+    exit_code = app.exec()
+    close_databases()
+    sys.exit(exit_code)
@@ -0,0 +1,99 @@
+from typing import Optional
+from GameVersion import version_range
+
+
+class ModRecord:
+    """ Plain data of a single mod. Only the visible records get a live ModInfoWidget (see ModListView) """
+    __slots__ = ("mod_id", "game_id", "title", "tags", "mod_version", "supported_game_version", "required_mods",
+                 "filepath", "incompatible_mods", "commentary", "image_path", "saved", "highlight", "fingerprint",
+                 "current_fingerprint", "duplicate_of")
+
+    def __init__(self, game_id: int = 0):
+        self.mod_id = None  # Mod_ID in the database, None until the mod is saved
+        self.game_id = game_id
+        self.saved = False
+        self.highlight = ""  # frame stylesheet set by MainWindow highlight functions, "" means default color
+        self.fingerprint = None  # content fingerprint of the mod files when the mod was saved (see ModFingerprint.py)
+        self.current_fingerprint = None  # fingerprint of the files now, None until Game.fingerprint_mods
+        self.duplicate_of = None  # the mod whose files are the same, set by Game.fingerprint_mods
+        self.clear_args()
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "ModRecord":
+        """ Creates a record from the 'SELECT * FROM Mods' row """
+        record = cls(row[1])
+        record.mod_id = row[0]
+        record.title = row[2]
+        record.tags = row[3]
+        record.mod_version = row[4]
+        record.supported_game_version = row[5]
+        record.required_mods = row[6]
+        record.filepath = row[7]
+        record.incompatible_mods = row[8]
+        record.commentary = row[9]
+        record.image_path = row[10]
+        record.fingerprint = row[13] if len(row) > 13 else None
+        record.saved = True
+        return record
+
+    @classmethod
+    def blank(cls, game_id: int, widget_localization: dict) -> "ModRecord":
+        """ Creates a record filled with placeholder texts (blank mod widget) """
+        record = cls(game_id)
+        record.title = widget_localization["init_title"]
+        record.tags = widget_localization["init_tags"]
+        record.filepath = widget_localization["init_filepath"]
+        record.mod_version = widget_localization["init_mode_version"]
+        record.supported_game_version = widget_localization["init_supported_game_version"]
+        record.required_mods = widget_localization["init_required_mods"]
+        record.incompatible_mods = widget_localization["init_incompatible_mods"]
+        record.commentary = widget_localization["init_commentary"]
+        return record
+
+    def clear_args(self):
+        """ Makes all mod fields empty. Tags and mods are stored as comma-joined strings """
+        self.title = ''
+        self.tags = ''
+        self.filepath = ''
+        self.image_path = ''
+        self.mod_version = ''
+        self.supported_game_version = ''
+        self.required_mods = ''
+        self.incompatible_mods = ''
+        self.commentary = ''
+
+    def get_args(self) -> list:
+        """ Returns a list with all mod info """
+        return [self.title, self.tags, self.filepath, self.mod_version, self.supported_game_version, self.required_mods,
+                self.incompatible_mods, self.commentary]
+
+    @property
+    def changed_since_save(self) -> bool:
+        """ The mod files have changed since the mod was saved (False if they haven't been fingerprinted) """
+        return self.current_fingerprint is not None and self.fingerprint is not None and \
+            self.current_fingerprint != self.fingerprint
+
+    def saved_fingerprint(self) -> Optional[str]:
+        """ Fingerprint written when the mod is saved: the files as they are now if they have been fingerprinted """
+        return self.current_fingerprint or self.fingerprint
+
+    def mark_saved(self, mod_id: int) -> None:
+        """ The record has been written to the database """
+        self.mod_id, self.saved = mod_id, True
+        self.fingerprint = self.saved_fingerprint()
+
+    def version_keys(self) -> tuple:
+        """ (low, high) keys of the supported game version for the database, (None, None) if it isn't a version """
+        return version_range(self.supported_game_version) or (None, None)
+
+    def insert_args(self) -> tuple:
+        """ Parameters of Database.INSERT_MOD """
+        return (self.game_id, self.title, self.tags, self.mod_version, self.supported_game_version, self.required_mods,
+                self.filepath, self.incompatible_mods, self.commentary, self.image_path, *self.version_keys(),
+                self.saved_fingerprint())
+
+    def update_args(self) -> tuple:
+        """ Parameters of Database.UPDATE_MOD """
+        return (self.title, self.tags, self.mod_version, self.supported_game_version, self.required_mods,
+                self.filepath, self.incompatible_mods, self.commentary, self.image_path, *self.version_keys(),
+                self.saved_fingerprint(), self.mod_id)
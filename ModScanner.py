@@ -0,0 +1,72 @@
+import threading
+from os import path
+from typing import Callable, Optional
+from ModRecord import ModRecord
+from DescriptorParser import Descriptor, read_descriptor
+from ModDiscovery import DEFAULT_DEPTH, DEFAULT_IGNORE, find_descriptors, mod_folder
+from Tracing import traced
+
+
+def fill_record(record: ModRecord, descriptor_file_path: str, descriptor: Descriptor = None, images: tuple = None) -> None:
+    """ Sets the record fields from the descriptor file (for now only paradox games descriptor type)
+        and looks for the mod picture. Fields that aren't in the descriptor stay as they are.
+        The file isn't read again if its descriptor is already parsed, the folder isn't read again
+        if the pictures of the descriptor's folder are already found (see ModDiscovery) """
+    if descriptor is None:
+        descriptor = read_descriptor(descriptor_file_path)
+    descriptor_folder = descriptor_file_path[:descriptor_file_path.rfind("/")]
+    if descriptor.name:
+        record.title = descriptor.name
+    if descriptor.version:
+        record.mod_version = descriptor.version
+    if descriptor.supported_version:
+        record.supported_game_version = descriptor.supported_version
+    record.tags = ",".join(descriptor.tags)
+    record.required_mods = ",".join(descriptor.dependencies)
+    if descriptor.path:
+        record.filepath = descriptor.path if path.exists(descriptor.path) else descriptor_folder  # check if filepath exists
+    elif record.filepath == '':
+        record.filepath = descriptor_folder
+
+    if descriptor.picture and record.filepath != '':  # path for image file
+        record.image_path = record.filepath + '/' + descriptor.picture
+    else:
+        if images is None or record.filepath != descriptor_folder:  # look for some image files in the mod folder
+            images = mod_folder(record.filepath).images
+        if images:
+            record.image_path = images[0]
+
+
+def read_mod(descriptor_file_path: str, images: tuple = None) -> Optional[ModRecord]:
+    """ Creates a record from the descriptor file. Returns None if the descriptor has no title """
+    new_mod = ModRecord()
+    fill_record(new_mod, descriptor_file_path, images=images)
+    return new_mod if new_mod.title else None
+
+
+@traced("parse")
+def scan_folder(roots: list, progress: Callable[[int, int], None] = None, cancel_event: threading.Event = None,
+                max_workers: int = None, max_depth: int = DEFAULT_DEPTH, ignore=DEFAULT_IGNORE) -> tuple:
+    """ Finds (ModDiscovery.discover) and parses all descriptors of the folders on a thread pool (the work is mostly
+        file system access). progress(done, total) is called after each descriptor. Returns ([ModRecord], [(descriptor, error)]),
+        records are in the order of the descriptors. Raises OSError if a folder can't be read """
+    from concurrent.futures import ThreadPoolExecutor, as_completed  # it takes ~15 ms to import, mmt needs it only for scan
+    found = find_descriptors(roots, max_depth, ignore)
+    descriptors = [descriptor for descriptor, _ in found]
+    results = [None] * len(descriptors)
+    failures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(read_mod, descriptor, images): index for index, (descriptor, images) in enumerate(found)}
+        for done, future in enumerate(as_completed(futures), 1):
+            if cancel_event is not None and cancel_event.is_set():
+                for not_done in futures:
+                    not_done.cancel()
+                break
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as fail:
+                failures.append((descriptors[index], fail))
+            if progress is not None:
+                progress(done, len(descriptors))
+    return [record for record in results if record is not None], failures
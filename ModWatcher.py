@@ -0,0 +1,225 @@
+from collections import deque
+from os import path, scandir, stat
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+from ModScanner import read_mod
+from ModDiscovery import mod_folder
+
+WATCH_DELAY = 500  # ms without new events before the changes are applied (a mod update touches many files)
+POLL_INTERVAL = 2000  # ms between polls of the paths the system can't watch
+POLL_SLICE = 200  # paths checked by one poll
+
+
+def path_stamp(file_path: str) -> tuple:
+    """ (mtime, size) of the path, None if it doesn't exist. It tells a polled path has changed """
+    try:
+        file_stat = stat(file_path)
+    except OSError:
+        return None
+    return file_stat.st_mtime_ns, file_stat.st_size
+
+
+def mod_descriptor(folder: str) -> str:
+    """ Returns the descriptor file of the mod folder or '' if there is none (yet) """
+    try:
+        return mod_folder(folder).descriptor
+    except OSError as error:
+        print(error)
+    return ""
+
+
+class ModWatcher(QObject):
+    """ Watches folders and descriptors of the loaded games' saved mods and the workshop roots of the config
+        ('watch_roots = folder;folder'). Events are collected until there are none for WATCH_DELAY ms, then only
+        the mods of the changed folders are re-parsed and each game writes them in one transaction (Game.update_mods).
+        New folders of a root become mods of the game that has most mods in the root, removed folders are reported.
+        The system notifies about changes (inotify, ReadDirectoryChangesW), paths it refuses to watch
+        (e.g. inotify limit is reached) are polled by small slices """
+    applying = pyqtSignal()  # changes are about to be written, e.g. widgets should commit their edits
+    applied = pyqtSignal(object, object, list, list)  # game, UpdateReport, new mods, folders that don't exist anymore
+
+    def __init__(self, database_name: str, manifest, parent=None):
+        super().__init__(parent)
+        self.database_name = database_name
+        self.manifest = manifest  # DescriptorManifest shared with the main window
+        self.games_by_folder = {}  # mod folder: {game: None}
+        self.folder_of = {}  # descriptor path: its mod folder
+        self.roots = {}  # workshop root: names of its folders that are mods
+        self.incoming = {}  # new folder of a root without a descriptor yet: root
+        self.pending = set()  # changed paths since the last apply
+        self.polled = {}  # path that isn't watched by the system: its path_stamp
+        self.poll_queue = deque()
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.path_changed)
+        self.watcher.fileChanged.connect(self.path_changed)
+        self.delay_timer = QTimer(self)
+        self.delay_timer.setSingleShot(True)
+        self.delay_timer.setInterval(WATCH_DELAY)
+        self.delay_timer.timeout.connect(self.apply_changes)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(POLL_INTERVAL)
+        self.poll_timer.timeout.connect(self.poll)
+
+    def watch_paths(self, paths: list) -> None:
+        """ Starts watching the existing paths that aren't watched, e.g. again after a file has been replaced """
+        watched = set(self.watcher.files())
+        watched.update(self.watcher.directories())
+        new_paths = [new_path for new_path in dict.fromkeys(paths)
+                     if new_path not in watched and new_path not in self.polled and path.exists(new_path)]
+        if new_paths:
+            for failed in self.watcher.addPaths(new_paths):
+                self.polled[failed] = path_stamp(failed)
+                self.poll_queue.append(failed)
+        if self.polled and not self.poll_timer.isActive():
+            self.poll_timer.start()
+
+    def watch_game(self, game) -> None:
+        """ Watches saved mods of the game, the mods that are already watched cost nothing """
+        self.watch_mods(game, [mod for mod in game.mods if game not in self.games_by_folder.get(mod.filepath, ())])
+
+    def watch_mods(self, game, mods: list) -> None:
+        """ Watches folders and descriptors of the saved mods, again if a descriptor has been replaced """
+        paths = []
+        for mod in mods:
+            if not mod.saved or not mod.filepath:
+                continue
+            self.games_by_folder.setdefault(mod.filepath, {})[game] = None
+            if not path.isdir(mod.filepath):  # e.g. the database is from another computer
+                continue
+            descriptor = self.manifest.known_descriptor(mod.mod_id, mod.filepath) or mod_descriptor(mod.filepath)
+            if descriptor:
+                self.folder_of[descriptor] = mod.filepath
+                paths.append(descriptor)
+            paths.append(mod.filepath)
+        self.watch_paths(paths)
+
+    def unwatch_game(self, game) -> None:
+        """ Stops watching the mods of the game (e.g. it is deleted), folders of the other games stay watched """
+        unwatched = set()
+        for folder, games in list(self.games_by_folder.items()):
+            if game in games:
+                del games[game]
+                if not games:
+                    del self.games_by_folder[folder]
+                    unwatched.add(folder)
+        paths = [file_path for file_path, folder in self.folder_of.items() if folder in unwatched] + list(unwatched)
+        for file_path in paths:
+            self.folder_of.pop(file_path, None)
+            self.polled.pop(file_path, None)
+        watched = set(self.watcher.files())
+        watched.update(self.watcher.directories())
+        paths = [file_path for file_path in paths if file_path in watched]
+        if paths:
+            self.watcher.removePaths(paths)
+
+    def watch_roots(self, roots: list) -> None:
+        """ Watches the folders where new mods appear (e.g. steamapps/workshop/content/<game id>) """
+        for root in roots:
+            root = root.strip().replace("\\", "/").rstrip("/")
+            if root and root not in self.roots and path.isdir(root):
+                self.roots[root] = self.root_folders(root)
+                self.watch_paths([root])
+
+    @staticmethod
+    def root_folders(root: str) -> set:
+        try:
+            with scandir(root) as entries:
+                return {entry.name for entry in entries if entry.is_dir()}
+        except OSError as error:
+            print(error)
+            return set()
+
+    def path_changed(self, changed_path: str) -> None:
+        self.pending.add(changed_path)
+        self.delay_timer.start()  # restarted by every event, changes are applied when the events stop
+
+    def poll(self) -> None:
+        """ Checks the next slice of the polled paths, a path that has changed is handled as a watched one """
+        for _ in range(min(POLL_SLICE, len(self.poll_queue))):
+            polled_path = self.poll_queue.popleft()
+            if polled_path not in self.polled:  # not watched anymore
+                continue
+            self.poll_queue.append(polled_path)
+            stamp = path_stamp(polled_path)
+            if stamp != self.polled[polled_path]:
+                self.polled[polled_path] = stamp
+                self.path_changed(polled_path)
+        if not self.poll_queue:
+            self.poll_timer.stop()
+
+    def root_owner(self, root: str):
+        """ The game with most mods in the root, None if no game has mods there """
+        counter = {}
+        for folder, games in self.games_by_folder.items():
+            if folder.startswith(root + "/"):
+                for game in games:
+                    counter[game] = counter.get(game, 0) + 1
+        return max(counter, key=counter.get) if counter else None
+
+    def check_root(self, root: str, new_mods: dict, missing: dict) -> None:
+        """ Finds new and removed folders of the root. New mods are added to new_mods {game: [ModRecord]},
+            folders of the saved mods that have been removed to missing {game: {folder}} """
+        folders = self.root_folders(root)
+        known = self.roots[root]
+        owner = self.root_owner(root)
+        for name in sorted(folders - known):
+            folder = root + "/" + name
+            if folder in self.games_by_folder:  # the mod is already added
+                known.add(name)
+                continue
+            descriptor = mod_descriptor(folder)
+            if not descriptor:  # e.g. Steam creates the folder first, the descriptor is checked again when it appears
+                self.incoming[folder] = root
+                self.watch_paths([folder])
+                continue
+            self.incoming.pop(folder, None)
+            known.add(name)
+            try:
+                new_mod = read_mod(descriptor)
+            except Exception as error:
+                print(f"{descriptor}: {error}")
+                continue
+            if new_mod is None:
+                continue
+            if owner is None:
+                print(f"New mod '{new_mod.title}' isn't added, no game has mods in {root}")
+                continue
+            new_mods.setdefault(owner, []).append(new_mod)
+        for name in known - folders:
+            known.discard(name)
+            for game in self.games_by_folder.get(root + "/" + name, ()):
+                missing.setdefault(game, set()).add(root + "/" + name)
+
+    def apply_changes(self) -> None:
+        """ Re-parses the mods of the changed folders and adds the new mods, one write per game """
+        changed_paths, self.pending = self.pending, set()
+        changed_folders, new_mods, missing = {}, {}, {}  # game: {folder}, game: [ModRecord], game: {folder}
+        for changed_path in changed_paths:
+            if changed_path in self.roots:
+                self.check_root(changed_path, new_mods, missing)
+                continue
+            if changed_path in self.incoming:
+                self.check_root(self.incoming[changed_path], new_mods, missing)
+                continue
+            folder = self.folder_of.get(changed_path, changed_path)
+            for game in self.games_by_folder.get(folder, ()):
+                if path.isdir(folder):
+                    changed_folders.setdefault(game, set()).add(folder)
+                else:
+                    missing.setdefault(game, set()).add(folder)
+        if not changed_folders and not new_mods and not missing:
+            return
+
+        self.applying.emit()
+        for game in list(dict.fromkeys([*changed_folders, *new_mods, *missing])):
+            folders = changed_folders.get(game, set())
+            mods = [mod for mod in game.mods if mod.filepath in folders] if folders else []
+            for new_mod in new_mods.get(game, []):
+                if game.find_mod(new_mod.title, new_mod.filepath):  # e.g. added by the user meanwhile
+                    continue
+                new_mod.game_id = game.id
+                game.add_mod(new_mod)
+                mods.append(new_mod)
+            report = game.update_mods(self.database_name, self.manifest, mods)
+            self.watch_mods(game, mods)  # new mods, replaced descriptors aren't watched anymore
+            self.applied.emit(game, report, [mod for mod in mods if mod in new_mods.get(game, ())],
+                              sorted(missing.get(game, ())))
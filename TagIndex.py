@@ -0,0 +1,132 @@
+import re
+
+# ↓ query tokens: parentheses, ',' (same as OR, the old search syntax) and upper-case operators, tags are the text between them
+QUERY_TOKEN_RE = re.compile(r'(\(|\)|,|\bAND\b|\bOR\b|\bNOT\b)')
+
+
+def split_tags(tags: str) -> list:
+    """ Tags of the comma-joined string without spaces around them and without empty ones, in their order """
+    result = []
+    for tag in (tags or "").split(","):
+        tag = tag.strip()
+        if tag and tag not in result:
+            result.append(tag)
+    return result
+
+
+def tag_key(tag: str) -> str:
+    """ Tags are compared case-insensitively """
+    return tag.strip().casefold()
+
+
+class TagQueryError(ValueError):
+    """ The query can't be parsed (e.g. unbalanced parentheses or an operator without a tag) """
+
+
+class TagIndex:
+    """ Inverted index of a game: tag → set of mods. Mods are ModRecords (unsaved mods have no id yet).
+        Queries like 'Graphics AND (Map OR Balance) AND NOT Fixes' are answered with set operations """
+    def __init__(self):
+        self.mods_by_tag = {}  # tag key: {mod}
+        self.tags_of = {}  # mod: (tags string the mod was indexed with, its tag keys)
+
+    def add(self, mod) -> None:
+        """ Indexes the mod or re-indexes it if its tags string has changed """
+        indexed = self.tags_of.get(mod)
+        if indexed is not None and indexed[0] == mod.tags:
+            return
+        if indexed is not None:
+            self.remove(mod)
+        keys = frozenset(tag_key(tag) for tag in split_tags(mod.tags))
+        self.tags_of[mod] = (mod.tags, keys)
+        for key in keys:
+            self.mods_by_tag.setdefault(key, set()).add(mod)
+
+    def remove(self, mod) -> None:
+        indexed = self.tags_of.pop(mod, None)
+        if indexed is None:
+            return
+        for key in indexed[1]:
+            mods = self.mods_by_tag[key]
+            mods.discard(mod)
+            if not mods:
+                del self.mods_by_tag[key]
+
+    def clear(self) -> None:
+        self.mods_by_tag.clear()
+        self.tags_of.clear()
+
+    def mods_with(self, tag: str) -> set:
+        return self.mods_by_tag.get(tag_key(tag), set())
+
+    def search(self, query: str) -> set:
+        """ Returns the set of mods that match the query (see parse_query). Raises TagQueryError """
+        result = parse_query(query, lambda tag: set(self.mods_with(tag)), lambda left, right: left & right,
+                             lambda left, right: left | right, lambda mods: self.tags_of.keys() - mods)
+        return set() if result is None else result
+
+
+class QueryParser:
+    """ Recursive descent parser of tag queries, the result is built by the functions given to parse_query """
+    def __init__(self, tag, both, either, negate):
+        self.tag, self.both, self.either, self.negate = tag, both, either, negate
+
+    def parse_or(self, tokens: list, position: int) -> tuple:
+        result, position = self.parse_and(tokens, position)
+        while position < len(tokens) and tokens[position] in ("OR", ","):
+            right, position = self.parse_and(tokens, position + 1)
+            result = self.either(result, right)
+        return result, position
+
+    def parse_and(self, tokens: list, position: int) -> tuple:
+        result, position = self.parse_not(tokens, position)
+        while position < len(tokens) and tokens[position] == "AND":
+            right, position = self.parse_not(tokens, position + 1)
+            result = self.both(result, right)
+        return result, position
+
+    def parse_not(self, tokens: list, position: int) -> tuple:
+        if position >= len(tokens):
+            raise TagQueryError("a tag is expected at the end of the query")
+        token = tokens[position]
+        if token == "NOT":
+            result, position = self.parse_not(tokens, position + 1)
+            return self.negate(result), position
+        if token == "(":
+            result, position = self.parse_or(tokens, position + 1)
+            if position >= len(tokens) or tokens[position] != ")":
+                raise TagQueryError("')' is missing")
+            return result, position + 1
+        if token in (")", ",", "AND", "OR"):
+            raise TagQueryError(f"a tag is expected before '{token}'")
+        return self.tag(token), position + 1
+
+
+def parse_query(query: str, tag, both, either, negate):
+    """ Parses a query like 'Graphics AND (Map OR Balance) AND NOT Fixes'. OR (or ','), AND, NOT and parentheses are
+        supported, AND binds tighter than OR. The result is built bottom-up, tags from left to right: tag(tag),
+        both(left, right) for AND, either(left, right) for OR, negate(result) for NOT.
+        Returns None for an empty query. Raises TagQueryError """
+    tokens = [token.strip() for token in QUERY_TOKEN_RE.split(query) if token.strip()]
+    while tokens and tokens[-1] == ",":  # 'tag1, tag2,' is fine
+        tokens.pop()
+    if not tokens:
+        return None
+    result, position = QueryParser(tag, both, either, negate).parse_or(tokens, 0)
+    if position != len(tokens):
+        raise TagQueryError(f"unexpected '{tokens[position]}'")
+    return result
+
+
+def query_sql(query: str) -> tuple:
+    """ Returns (SQL condition on Mod_ID, its parameters) that matches the query through the ModTags table,
+        ('', []) for an empty query. ModTags keeps the tags casefolded, so the parameters are too. Raises TagQueryError """
+    parameters = []
+
+    def tag(text: str) -> str:
+        parameters.append(tag_key(text))
+        return "Mod_ID IN (SELECT Mod_ID FROM ModTags WHERE Tag = ?)"
+
+    condition = parse_query(query, tag, lambda left, right: f"({left} AND {right})",
+                            lambda left, right: f"({left} OR {right})", lambda condition: f"(NOT {condition})")
+    return condition or "", parameters
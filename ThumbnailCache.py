@@ -0,0 +1,133 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from os import makedirs, path, replace, stat
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from Tracing import traced
+
+THUMBNAIL_HEIGHT = 200  # height of the picture in ModInfoWidget
+
+
+class ThumbnailCache:
+    """ Cache of scaled mod pictures. Key is image path + its mtime and size, so a changed file is scaled again.
+        Recently used thumbnails are kept in memory (LRU bounded in bytes), all of them are stored on disk.
+        get() may be called from worker threads """
+    def __init__(self, cache_dir: str = "thumbnails", max_bytes: int = 64 * 1024 * 1024, height: int = THUMBNAIL_HEIGHT):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.height = height
+        self.images = OrderedDict()  # key: QImage, the last one is the most recently used
+        self.used_bytes = 0
+        self.lock = threading.Lock()
+
+    def key(self, image_path: str) -> str:
+        """ Returns cache key of the image, raises OSError if there is no such file """
+        file_stat = stat(image_path)
+        key = f"{path.abspath(image_path)}|{file_stat.st_mtime_ns}|{file_stat.st_size}|{self.height}"
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+    def cached(self, image_path: str):
+        """ Returns the scaled image if it is in memory, None otherwise (null QImage if there is no such file) """
+        try:
+            key = self.key(image_path)
+        except (OSError, ValueError):
+            return QImage()
+        with self.lock:
+            image = self.images.get(key)
+            if image is not None:
+                self.images.move_to_end(key)
+            return image
+
+    @traced("image")
+    def get(self, image_path: str) -> QImage:
+        """ Returns the scaled image (null QImage if it can't be loaded) """
+        try:
+            key = self.key(image_path)
+        except (OSError, ValueError):
+            return QImage()
+
+        with self.lock:
+            image = self.images.get(key)
+            if image is not None:  # memory
+                self.images.move_to_end(key)
+                return image
+
+        disk_path = path.join(self.cache_dir, key + ".png")
+        image = QImage(disk_path) if path.exists(disk_path) else QImage()
+        if image.isNull():  # the original picture has to be decoded and scaled
+            image = QImage(image_path)
+            if image.isNull():
+                return image
+            image = image.scaledToHeight(self.height, Qt.SmoothTransformation)
+            try:
+                makedirs(self.cache_dir, exist_ok=True)
+                temp_path = f"{disk_path}.{threading.get_ident()}.tmp"  # other threads never see a half-written file
+                if image.save(temp_path, "PNG"):
+                    replace(temp_path, disk_path)
+            except OSError as error:
+                print("Thumbnail cache error: ", error)
+        self.put(key, image)
+        return image
+
+    def put(self, key: str, image: QImage) -> None:
+        """ Adds the image to memory, removes least recently used ones above the limit """
+        with self.lock:
+            if key in self.images:
+                return
+            self.images[key] = image
+            self.used_bytes += image.sizeInBytes()
+            while self.used_bytes > self.max_bytes and len(self.images) > 1:
+                _, old_image = self.images.popitem(last=False)
+                self.used_bytes -= old_image.sizeInBytes()
+
+
+class ThumbnailJob(QRunnable):
+    """ Decodes and scales one picture in a worker thread """
+    def __init__(self, loader: "ThumbnailLoader", generation: int, image_path: str):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.image_path = image_path
+
+    def run(self):
+        if self.generation != self.loader.generation:  # cancelled before it has started
+            return
+        image = self.loader.cache.get(self.image_path)
+        self.loader.job_finished.emit(self.generation, self.image_path, image)
+
+
+class ThumbnailLoader(QObject):
+    """ Loads thumbnails on a thread pool, results come back to the GUI thread through the 'loaded' signal """
+    loaded = pyqtSignal(str, QImage)  # image path, scaled image (null if it can't be loaded)
+    job_finished = pyqtSignal(int, str, QImage)  # emitted from the worker threads
+
+    def __init__(self, cache: ThumbnailCache):
+        super().__init__()
+        self.cache = cache
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max(1, QThreadPool.globalInstance().maxThreadCount() - 1))  # one core for the GUI
+        self.generation = 0  # increased by cancel_pending(), results of older jobs are dropped
+        self.pending = set()  # image paths that are queued or being loaded
+        self.job_finished.connect(self.finish_job)
+
+    def request(self, image_path: str) -> None:
+        """ Queues loading of the picture, the same picture is queued only once """
+        if image_path not in self.pending:
+            self.pending.add(image_path)
+            self.pool.start(ThumbnailJob(self, self.generation, image_path))
+
+    def cancel_pending(self) -> None:
+        """ Drops all queued jobs (e.g. when user opens another game) """
+        self.generation += 1
+        self.pool.clear()
+        self.pending.clear()
+
+    def finish_job(self, generation: int, image_path: str, image: QImage) -> None:
+        if generation == self.generation:
+            self.pending.discard(image_path)
+            self.loaded.emit(image_path, image)
+
+
+THUMBNAILS = ThumbnailCache()
+THUMBNAIL_LOADER = ThumbnailLoader(THUMBNAILS)
@@ -0,0 +1,145 @@
+""" Spans of the hot paths (database statements, descriptor parsing, image loads, widget construction) that tell where
+    the time of a freeze went. Tracing is off unless MMT_TRACE is set ('MMT_TRACE=1' or 'MMT_TRACE=trace.json') or
+    config.txt has 'trace = 1' ('trace = trace.json'). When it is on, the spans are written on exit as a Chrome trace
+    (chrome://tracing, ui.perfetto.dev) and a summary table of the operations is printed to stderr.
+    Off, a span costs one attribute check """
+import atexit
+import json
+import os
+import sys
+import threading
+from contextlib import nullcontext
+from functools import wraps
+from time import perf_counter_ns
+
+TRACE_ENV = "MMT_TRACE"  # environment variable that turns tracing on
+DEFAULT_TRACE_FILE = "mmt_trace.json"
+ON_VALUES = ("1", "on", "true", "yes")
+OFF_VALUES = ("", "0", "off", "false", "no")
+MAX_EVENTS = 1_000_000  # spans kept for the trace file (~100 MB of json), the summary counts all of them
+SUMMARY_ROWS = 40  # operations with the most total time in the printed table
+NO_SPAN = nullcontext()  # span of the disabled tracer, it is reusable
+
+
+class Span:
+    """ Times the 'with' block """
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self) -> "Span":
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.tracer.record(self.name, self.category, self.start, perf_counter_ns(), self.args)
+
+
+class Tracer:
+    """ Collects spans of all threads. Events are (name, category, thread id, start ns, duration ns, args),
+        the summary is {(category, name): [calls, total ns, max ns]} """
+    def __init__(self):
+        self.enabled = False
+        self.trace_file = ""
+        self.events = []
+        self.summary = {}
+        self.thread_names = {}  # thread id: name, for the trace viewer
+        self.lock = threading.Lock()
+        self.start = perf_counter_ns()
+
+    def enable(self, setting: str) -> bool:
+        """ Turns tracing on if the setting is '1' or a trace file name, the results are written on exit.
+            Returns whether tracing is on """
+        setting = (setting or "").strip()
+        if self.enabled or setting.lower() in OFF_VALUES:
+            return self.enabled
+        self.trace_file = DEFAULT_TRACE_FILE if setting.lower() in ON_VALUES else setting
+        self.enabled = True
+        atexit.register(self.finish)
+        return True
+
+    def span(self, name: str, category: str, **args):
+        """ Context manager that records the block as a span (it does nothing if tracing is off) """
+        return Span(self, name, category, args) if self.enabled else NO_SPAN
+
+    def record(self, name: str, category: str, start: int, end: int, args: dict = None) -> None:
+        thread = threading.current_thread()
+        with self.lock:
+            if thread.ident not in self.thread_names:
+                self.thread_names[thread.ident] = thread.name
+            if len(self.events) < MAX_EVENTS:
+                self.events.append((name, category, thread.ident, start, end - start, args))
+            stats = self.summary.get((category, name))
+            if stats is None:
+                self.summary[(category, name)] = [1, end - start, end - start]
+            else:
+                stats[0] += 1
+                stats[1] += end - start
+                stats[2] = max(stats[2], end - start)
+
+    def chrome_trace(self) -> dict:
+        """ Trace Event Format: complete events ('X') in microseconds since the tracer was created """
+        pid = os.getpid()
+        with self.lock:
+            events, thread_names = list(self.events), dict(self.thread_names)
+        thread_ids = {ident: number for number, ident in enumerate(thread_names, 1)}  # small numbers for the viewer
+        trace_events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_ids[ident], "args": {"name": name}}
+                        for ident, name in thread_names.items()]
+        for name, category, ident, start, duration, args in events:
+            event = {"name": name, "cat": category, "ph": "X", "pid": pid, "tid": thread_ids[ident],
+                     "ts": (start - self.start) / 1000, "dur": duration / 1000}
+            if args:
+                event["args"] = args
+            trace_events.append(event)
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def summary_table(self) -> str:
+        """ Operations with the most total time first: calls, total, mean and max ms """
+        with self.lock:
+            rows = sorted(self.summary.items(), key=lambda item: item[1][1], reverse=True)
+        lines = [f"{'category':<10} {'operation':<60} {'calls':>8} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+        for (category, name), (calls, total, longest) in rows[:SUMMARY_ROWS]:
+            lines.append(f"{category:<10} {name[:60]:<60} {calls:>8} {total / 1e6:>10.1f} "
+                         f"{total / calls / 1e6:>9.3f} {longest / 1e6:>9.1f}")
+        if len(rows) > SUMMARY_ROWS:
+            lines.append(f"... {len(rows) - SUMMARY_ROWS} more operations are in the trace")
+        return "\n".join(lines)
+
+    def finish(self) -> None:
+        """ Writes the trace file and prints the summary (on exit) """
+        if not self.summary:
+            return
+        try:
+            with open(self.trace_file, "w", encoding="utf-8") as trace_file:
+                json.dump(self.chrome_trace(), trace_file)
+            print(f"Trace: {os.path.abspath(self.trace_file)} ({len(self.events)} spans)", file=sys.stderr)
+        except (OSError, TypeError, ValueError) as error:
+            print("Trace file error: ", error, file=sys.stderr)
+        print(self.summary_table(), file=sys.stderr)  # stdout may be the output of mmt (e.g. export)
+
+
+def traced(category: str, name: str = None):
+    """ Decorator that records every call of the function as a span. A Qt slot connected to a signal with arguments
+        it doesn't take needs @pyqtSlot() above, PyQt can't see the signature through the wrapper """
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return function(*args, **kwargs)
+            start = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                TRACER.record(span_name, category, start, perf_counter_ns())
+        return wrapper
+    return decorator
+
+
+TRACER = Tracer()
+TRACER.enable(os.environ.get(TRACE_ENV, ""))  # the config flag is applied by the app at startup
@@ -0,0 +1,207 @@
+""" Benchmark of the app's hot paths on synthetic libraries. It generates N fake Paradox mod folders (descriptors with
+    tags, dependencies and a dummy PNG thumbnail), then drives the main window with Qt offscreen: find_database,
+    startup (import_games), folder_mods, save_all, Game.import_mods, open_mods, update_all and the highlights.
+    Results are written as json, --compare prints the ratio to an earlier run.
+    Run from the repository root: python benchmarks/library_benchmark.py [--sizes 100 1000 10000] [--output file.json] """
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from os import path
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # no window is shown, it runs without a display
+
+TAGS = ("Gameplay", "Balance", "Map", "Graphics", "Fixes", "Culture", "Religion", "Events", "Utilities", "Translation")
+GAME_TITLE = "Benchmark game"
+REPEAT = 3  # runs of the operations that don't change the library, the best one is reported
+
+
+def png_image(width: int, height: int) -> bytes:
+    """ A valid gray RGB PNG of the size, made without Qt (the generator runs before QApplication) """
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+    rows = b"".join(b"\x00" + bytes((index * 7 % 256, 120, 200)) * width for index in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) +
+            chunk(b"IDAT", zlib.compress(rows, 6)) + chunk(b"IEND", b""))
+
+
+def mod_title(index: int) -> str:
+    return f"Benchmark mod {index}"
+
+
+def descriptor_text(index: int, count: int, version: str = "1.0") -> str:
+    randomizer = random.Random(index)  # the same library for the same count
+    tags = "\n".join(f'\t"{tag}"' for tag in randomizer.sample(TAGS, 3))
+    required = [mod_title(randomizer.randrange(index)) for _ in range(randomizer.randint(0, 3)) if index]
+    if randomizer.random() < 0.02:
+        required.append(f"Missing mod {index}")
+    dependencies = "\n".join(f'\t"{title}"' for title in dict.fromkeys(required))
+    return (f'version="{version}.{index}"\ntags={{\n{tags}\n}}\nname="{mod_title(index)}"\n'
+            f'dependencies={{\n{dependencies}\n}}\npicture="thumbnail.png"\n'
+            f'supported_version="1.{index % 12}.*"\nremote_file_id="{100000 + index}"\n')
+
+
+def make_library(folder: str, count: int, thumbnail_size: tuple = (256, 256)) -> list:
+    """ Creates count mod folders (<folder>/<workshop id>/descriptor.mod + thumbnail.png), returns their descriptors """
+    image = png_image(*thumbnail_size)
+    descriptors = []
+    for index in range(count):
+        mod_folder = path.join(folder, str(100000 + index))
+        os.makedirs(mod_folder)
+        descriptors.append(path.join(mod_folder, "descriptor.mod").replace("\\", "/"))
+        with open(descriptors[-1], "w", encoding="utf-8") as descriptor_file:
+            descriptor_file.write(descriptor_text(index, count))
+        with open(path.join(mod_folder, "thumbnail.png"), "wb") as image_file:
+            image_file.write(image)
+    return descriptors
+
+
+class Timer:
+    """ Collects {operation: seconds} of one library size """
+    def __init__(self, app):
+        self.app = app
+        self.results = {}
+
+    def run(self, name: str, operation, repeat: int = 1) -> None:
+        """ Times operation() and the events it has posted (repaint of the list), the best of repeat runs """
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            operation()
+            self.app.processEvents()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        self.results[name] = round(best, 6)
+        print(f"  {name:<30} {best * 1000:10.1f} ms")
+
+
+def benchmark_size(app, work_folder: str, count: int, thumbnail_size: tuple) -> dict:
+    import ModManagerTool
+    from Database import get_database, close_databases, find_database, INSERT_GAME
+    from GameLibrary import Game
+
+    size_folder = path.join(work_folder, str(count))
+    mods_folder = path.join(size_folder, "mods").replace("\\", "/")
+    os.makedirs(size_folder)
+    started = time.perf_counter()
+    descriptors = make_library(mods_folder, count, thumbnail_size)
+    print(f"{count} mods (generated in {time.perf_counter() - started:.1f} s)")
+
+    database_name = path.join(size_folder, "bench.sqlite")
+    con = get_database(database_name).connection()
+    con.execute(INSERT_GAME, (GAME_TITLE,))
+    con.commit()
+    timer = Timer(app)
+    windows = []
+    timer.run("find_database", lambda: find_database(size_folder), REPEAT)
+    timer.run("startup (import_games)", lambda: windows.append(ModManagerTool.MainWindow((database_name, 0), prefetch=False)))
+    window = windows[-1]
+    window.show()
+    game = window.games[0]
+    timer.run("open_mods (empty game)", lambda: game.button.click())
+
+    def folder_mods() -> None:  # the folder dialog is replaced, the scan runs on its thread as in the app
+        ModManagerTool.QFileDialog.getExistingDirectory = staticmethod(lambda *args: mods_folder)
+        window.folder_mods()
+        while window.folder_scanner.isRunning() or len(game.mods) < count:
+            app.processEvents()
+            time.sleep(0.001)
+    timer.run("folder_mods", folder_mods)
+    timer.run("save_all (insert)", window.save_all)
+    timer.run("save_all (update)", window.save_all)
+
+    def import_mods() -> None:
+        imported = Game()
+        imported.id = game.id
+        imported.import_mods(database_name)
+    timer.run("Game.import_mods", import_mods, REPEAT)
+    timer.run("open_mods", lambda: game.button.click(), REPEAT)
+    timer.run("open_mods (alphabetical)", window.ABCButton.click, REPEAT)
+    timer.run("open_mods (supported version)", window.supVersionButton.click, REPEAT)
+    window.searchEdit.setText("benchmark mod 1")
+    timer.run("search", window.search, REPEAT)
+    window.searchEdit.setText("")
+    window.search()
+
+    timer.run("update_all (new manifest)", window.update_all)
+    timer.run("update_all (unchanged)", window.update_all, REPEAT)
+    for index in range(0, count, 100):  # 1% of the descriptors get a new version
+        with open(descriptors[index], "w", encoding="utf-8") as descriptor_file:
+            descriptor_file.write(descriptor_text(index, count, version="2.0"))
+    timer.run("update_all (1% changed)", window.update_all)
+
+    window.tagsEdit.setText("Map AND NOT Graphics")
+    timer.run("tag_highlight", window.tag_highlight, REPEAT)
+    window.gameVersionEdit.setText("1.5.2")
+    timer.run("ver_highlight", window.ver_highlight, REPEAT)
+    window.gameNameEdit.setText(mod_title(count - 1))
+    timer.run("relation_highlight", window.relation_highlight, REPEAT)
+
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    close_databases()
+    return timer.results
+
+
+def compare(results: dict, old_file: str) -> None:
+    """ Prints new time / old time of every operation, > 1 is slower than before """
+    with open(old_file, encoding="utf-8") as old_results_file:
+        old_sizes = json.load(old_results_file)["sizes"]
+    print(f"compared with {old_file} (new / old time)")
+    for size, operations in results["sizes"].items():
+        for name, seconds in operations.items():
+            old = old_sizes.get(size, {}).get(name)
+            if old:
+                print(f"  {size:>6} {name:<30} {seconds / old:6.2f}x {'  slower' if seconds > old * 1.2 else ''}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark of the app on synthetic mod libraries")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="numbers of mods")
+    parser.add_argument("--thumbnail", default="256x256", help="size of the dummy thumbnails, WIDTHxHEIGHT")
+    parser.add_argument("--output", default=path.join(path.dirname(path.abspath(__file__)), "results.json"),
+                        help="json file with the results (benchmarks/results.json by default)")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="results of an earlier run")
+    args = parser.parse_args()
+    thumbnail_size = tuple(int(side) for side in args.thumbnail.lower().split("x"))
+
+    work_folder = tempfile.mkdtemp(prefix="mmt_benchmark_")
+    output = path.abspath(args.output)
+    for file in ("MMT.ui", "localization.json"):  # the app reads them from the current folder
+        shutil.copy(path.join(ROOT, file), work_folder)
+    with open(path.join(work_folder, "config.txt"), "w") as config_file:
+        config_file.write("lang = EN")
+    os.chdir(work_folder)
+    try:
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication(sys.argv[:1])
+        import ModManagerTool
+        ModManagerTool.app = app  # the module expects the application of its __main__ block
+        from PyQt5.QtCore import QT_VERSION_STR
+        results = {"created": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                   "qt": QT_VERSION_STR, "platform": platform.platform(), "thumbnail": args.thumbnail, "sizes": {}}
+        for count in args.sizes:
+            results["sizes"][str(count)] = benchmark_size(app, work_folder, count, thumbnail_size)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"results: {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
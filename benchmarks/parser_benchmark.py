@@ -0,0 +1,96 @@
+""" Micro-benchmark of DescriptorParser against the line-based loop that the app used before.
+    The parser is slower: ~25 us against ~9 us per descriptor in memory, ~40-55 us against ~25-35 us from files
+    (5000 descriptors). The regex pass alone takes about as long as the whole legacy loop, which only splits lines
+    and can't read inline or nested blocks, comments, multi-line strings and escapes. The difference is ~0.1 s
+    for 5000 mods, and 'update all' parses only the descriptors that have changed.
+    Run from the repository root: python benchmarks/parser_benchmark.py [number of descriptors] """
+import io
+import sys
+import tempfile
+import timeit
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from DescriptorParser import read_descriptor, read_descriptor_stream  # noqa: E402
+
+DESCRIPTOR = '''version="{index}.2.1"
+tags={{
+\t"Gameplay"
+\t"Balance"
+\t"Map"
+}}
+name="Benchmark mod {index}" # comment
+dependencies={{
+\t"Required mod {index}"
+\t"Another required mod"
+}}
+picture="thumbnail.png"
+supported_version="1.9.*"
+path="mod/benchmark_{index}"
+remote_file_id="{index}"
+'''
+
+
+def legacy_parse(lines: list) -> dict:
+    """ The loop that add_mod_with_info and update_mod_data used (kept here only for comparison) """
+    result = {"tags": [], "dependencies": []}
+    braces = False
+    braces_content = ''
+    for i in lines:
+        if '=' in i or '\t' in i or '}' in i:
+            if not braces:
+                key = i[:i.index('=')].strip()
+                if '#' in i:
+                    value = i[i.index('=') + 1:i.index('#')].strip('"\n ')
+                else:
+                    value = i[i.index('=') + 1::].strip('"\n ')
+            else:
+                braces_content = i.strip('\t\n"')
+
+            if key == 'name' or key == 'title':
+                result["name"] = value
+            elif (key == 'tags' or key == 'dependencies') and not braces:
+                braces = True
+            elif '}' in i and braces is True:
+                braces = False
+            elif braces is True and key in ('tags', 'dependencies'):
+                result[key].append(braces_content)
+            elif key in ('version', 'supported_version', 'path', 'picture'):
+                result[key] = value
+    return result
+
+
+def main(count: int) -> None:
+    texts = [DESCRIPTOR.format(index=index) for index in range(count)]
+    line_lists = [io.StringIO(text).readlines() for text in texts]
+
+    legacy = min(timeit.repeat(lambda: [legacy_parse(lines) for lines in line_lists], number=1, repeat=5))
+    parser = min(timeit.repeat(lambda: [read_descriptor_stream(io.StringIO(text)) for text in texts], number=1, repeat=5))
+    print(f"{count} descriptors in memory")
+    print(f"legacy loop:      {legacy * 1000:8.2f} ms ({legacy / count * 1e6:.1f} us per descriptor)")
+    print(f"DescriptorParser: {parser * 1000:8.2f} ms ({parser / count * 1e6:.1f} us per descriptor)")
+
+    with tempfile.TemporaryDirectory() as folder:  # the way the app reads them: open + parse
+        files = []
+        for index, text in enumerate(texts):
+            files.append(path.join(folder, f"{index}.mod"))
+            with open(files[-1], "w", encoding="utf-8") as descriptor_file:
+                descriptor_file.write(text)
+
+        def legacy_files():
+            for file in files:
+                with open(file, encoding="UTF8") as descriptor_file:
+                    legacy_parse(descriptor_file.readlines())
+
+        legacy = min(timeit.repeat(legacy_files, number=1, repeat=5))
+        parser = min(timeit.repeat(lambda: [read_descriptor(file) for file in files], number=1, repeat=5))
+    print(f"{count} descriptor files")
+    print(f"legacy loop:      {legacy * 1000:8.2f} ms ({legacy / count * 1e6:.1f} us per descriptor)")
+    print(f"DescriptorParser: {parser * 1000:8.2f} ms ({parser / count * 1e6:.1f} us per descriptor)")
+
+    inline = 'name="Inline"\ntags={"Gameplay" "Map"}\ndependencies={ "A" { nested = yes } "B" }\n'
+    print("inline tags block (the legacy loop fails on it):", read_descriptor_stream(io.StringIO(inline)).tags)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,347 @@
+""" Command line interface of the app. It doesn't import Qt, so it runs on a server without a display:
+    python mmt.py games | list | scan | export | import | check | fingerprint | conflicts  (python mmt.py <command> -h for the options) """
+import argparse
+import json
+import sys
+import time
+from os import path
+from Database import find_database, close_databases, search_mods, search_tags, SELECT_COMPATIBLE_MODS
+from GameLibrary import Game, connect_base, load_games
+from AppSettings import SETTINGS
+from ModScanner import scan_folder
+from ModDiscovery import parse_depth, parse_patterns, parse_roots
+from TagIndex import TagQueryError
+from GameVersion import version_range
+from LibraryTransfer import export_mods, import_mods, parse_remaps, IMPORT_CHUNK
+
+EXPORT_FIELDS = ("mod_id", "game_id", "title", "tags", "mod_version", "supported_game_version", "required_mods",
+                 "filepath", "incompatible_mods", "commentary", "image_path")
+
+
+class CliError(Exception):
+    """ A message for the user, the command fails with exit code 2 """
+
+
+def open_games(database_name: str, game: str = "") -> list:
+    """ Returns games of the database with their mods, only the game with this title or id if it is given """
+    games = load_games(database_name)
+    if type(games) == str:
+        raise CliError(games)
+    if game:
+        games = [found for found in games if found.title == game or str(found.id) == game]
+        if not games:
+            raise CliError(f"No game '{game}' in {database_name}")
+    for found in games:
+        found.load_mods(database_name)
+    return games
+
+
+def mod_row(mod) -> dict:
+    return {field: getattr(mod, field) for field in EXPORT_FIELDS}
+
+
+def command_games(args) -> int:
+    for game in open_games(args.database):
+        print(f"{game.id}\t{game.title}\t{len(game.mods)} mods")
+    return 0
+
+
+def command_list(args) -> int:
+    for game in open_games(args.database, args.game):
+        mods = list(game.mods)
+        if args.tags or args.search or args.game_version:
+            con = connect_base(args.database)
+            if type(con) == str:
+                raise CliError(con)
+        if args.tags:  # tag query on the ModTags table
+            try:
+                found_ids = set(search_tags(con, game.id, args.tags))
+            except TagQueryError as error:
+                raise CliError(f"Wrong tag query: {error}")
+            mods = [mod for mod in mods if mod.mod_id in found_ids]
+        if args.search:  # the best matches first
+            found_ids = [mod_id for mod_id, game_id in search_mods(con, args.search) if game_id == game.id]
+            listed = set(mods)
+            mods = [mod for mod in map(game.mod_by_id, found_ids) if mod in listed]
+        if args.game_version:  # range query on the version index, newest versions first
+            query = version_range(args.game_version)
+            if query is None:
+                raise CliError(f"'{args.game_version}' isn't a game version (e.g. 1.9.3, 1.9.*, '>=1.8 <1.10')")
+            found_ids = [row[0] for row in con.execute(SELECT_COMPATIBLE_MODS, (game.id, query[1], query[0]))]
+            listed = set(mods)
+            mods = [mod for mod in map(game.mod_by_id, found_ids) if mod in listed]
+        for mod in mods:
+            if args.json:
+                print(json.dumps(mod_row(mod), ensure_ascii=False))
+            else:
+                print(f"{mod.mod_id}\t{game.title}\t{mod.title}\t{mod.mod_version}\t{mod.tags}")
+    return 0
+
+
+def scan_roots(args) -> list:
+    """ Folders of the command line, the library roots of the config ('library_roots = folder;folder') if there are none """
+    if args.folders:
+        return args.folders
+    roots = parse_roots(SETTINGS.get("library_roots"))
+    if not roots:
+        raise CliError("No folder given and no 'library_roots = folder;folder' in config.txt")
+    return roots
+
+
+def command_scan(args) -> int:
+    """ Parses mods of the folders, adds the new ones to the game with --save """
+    started = time.perf_counter()
+    roots = scan_roots(args)
+    max_depth = parse_depth(SETTINGS.get("scan_depth")) if args.depth is None else args.depth
+    ignore = parse_patterns(SETTINGS.get("scan_ignore")) + tuple(args.ignore or ())
+    try:
+        records, failures = scan_folder(roots, max_workers=args.jobs, max_depth=max_depth, ignore=ignore)
+    except OSError as error:
+        raise CliError(str(error))
+    for descriptor, error in failures:
+        print(f"{descriptor}: {error}", file=sys.stderr)
+    if not args.save:
+        for mod in records:
+            print(f"{mod.title}\t{mod.mod_version}\t{mod.filepath}")
+        print(f"{len(records)} mods, {len(failures)} failed, {time.perf_counter() - started:.2f} s", file=sys.stderr)
+        return 1 if failures else 0
+
+    game = open_games(args.database, args.save)[0]
+    new_mods = []
+    for mod in records:
+        if not game.find_mod(mod.title, mod.filepath):  # mod with same title and path is already added
+            mod.game_id = game.id
+            game.add_mod(mod)
+            new_mods.append(mod)
+    not_saved_mods = game.save_mods(args.database)
+    for title in not_saved_mods:
+        print(f"Not saved: {title}", file=sys.stderr)
+    print(f"{len(records)} mods, {len(new_mods)} new, {len(new_mods) - len(not_saved_mods)} saved to '{game.title}', "
+          f"{len(failures)} failed, {time.perf_counter() - started:.2f} s", file=sys.stderr)
+    return 1 if failures or not_saved_mods else 0
+
+
+def file_format(args) -> str:
+    """ --format or the extension of the file, json lines by default """
+    if args.format:
+        return args.format
+    return "csv" if (getattr(args, "file", None) or args.output or "").lower().endswith(".csv") else "json"
+
+
+def remaps(args) -> list:
+    try:
+        return parse_remaps(args.remap)
+    except ValueError as error:
+        raise CliError(f"Wrong --remap: {error}")
+
+
+def command_export(args) -> int:
+    """ Streams mods of the database to the file, the database isn't loaded into memory """
+    path_remaps = remaps(args)
+    con = connect_base(args.database)
+    if type(con) == str:
+        raise CliError(con)
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        counter = export_mods(con, output, file_format(args), args.game, path_remaps)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if args.output:
+        print(f"{counter} mods exported to {args.output}", file=sys.stderr)
+    return 0
+
+
+def command_import(args) -> int:
+    """ Adds mods of a json lines or csv file (made by export) to the database """
+    started = time.perf_counter()
+    path_remaps = remaps(args)
+    con = connect_base(args.database)
+    if type(con) == str:
+        raise CliError(con)
+    try:
+        with open(args.file, encoding="utf-8-sig", newline="") as source:
+            report = import_mods(con, source, file_format(args), args.game, path_remaps, args.chunk)
+    except OSError as error:
+        raise CliError(str(error))
+    for line_number, error in report.bad_rows:
+        print(f"{args.file}:{line_number}: {error}", file=sys.stderr)
+    print(f"{report.imported} mods imported, {report.duplicates} already in the database, {len(report.bad_rows)} bad rows, "
+          f"{report.new_games} new games, {time.perf_counter() - started:.2f} s", file=sys.stderr)
+    return 1 if report.bad_rows else 0
+
+
+def check_game(game: Game) -> list:
+    """ Returns problems of the game: missing requirements, requirement cycles, incompatible mods, missing folders """
+    graph = game.dependency_graph
+    problems = []
+    for key, missing in sorted(graph.missing().items()):
+        problems.append(f"'{graph.title(key)}' requires missing mods: " + ", ".join(sorted(map(graph.title, missing))))
+    for cycle in graph.cycles():
+        problems.append("Mods require each other: " + ", ".join(map(graph.title, cycle)))
+    for key in sorted(graph.incompatible):
+        for other in sorted(graph.incompatible[key]):
+            if key < other and other in graph.mods_by_key and key in graph.mods_by_key:
+                problems.append(f"'{graph.title(key)}' and '{graph.title(other)}' are incompatible")
+    for mod in game.mods:
+        if mod.filepath and not path.isdir(mod.filepath):
+            problems.append(f"'{mod.title}' folder doesn't exist: {mod.filepath}")
+    return problems
+
+
+def command_check(args) -> int:
+    found_problems = False
+    for game in open_games(args.database, args.game):
+        problems = check_game(game)
+        found_problems = found_problems or bool(problems)
+        print(f"{game.title}: {len(problems) or 'no'} problems")
+        for problem in problems:
+            print(f"  {problem}")
+        if args.load_order:
+            load_order, cycled = game.dependency_graph.load_order()
+            print("  Load order: " + " → ".join(map(game.dependency_graph.title, load_order + cycled)))
+    return 1 if found_problems else 0
+
+
+def command_fingerprint(args) -> int:
+    """ Hashes files of the mods (only the files changed since the last run), prints the mods whose files have changed
+        since they were saved and the mods that are copies of another one. --save saves the changed mods """
+    started = time.perf_counter()
+    hashed_files = hashed_bytes = failed = 0
+    for game in open_games(args.database, args.game):
+        report = game.fingerprint_mods(args.database, max_workers=args.jobs)
+        hashed_files += report.hashed_files
+        hashed_bytes += report.hashed_bytes
+        failed += len(report.not_fingerprinted)
+        for title in report.not_fingerprinted:
+            print(f"Not fingerprinted: {title}", file=sys.stderr)
+        if args.json:
+            for mod in game.mods:
+                if mod.current_fingerprint is not None:
+                    print(json.dumps({**mod_row(mod), "fingerprint": mod.current_fingerprint,
+                                      "changed_since_save": mod.changed_since_save,
+                                      "duplicate_of": mod.duplicate_of and mod.duplicate_of.mod_id}, ensure_ascii=False))
+        else:
+            for mod in report.changed:
+                print(f"{game.title}\tchanged\t{mod.title}\t{mod.filepath}")
+            for mod in report.duplicates:
+                print(f"{game.title}\tduplicate\t{mod.title}\t{mod.filepath}\tof {mod.duplicate_of.mod_id} {mod.duplicate_of.title}")
+        if args.save and report.changed:
+            for title in game.save_mods(args.database, report.changed):
+                print(f"Not saved: {title}", file=sys.stderr)
+    print(f"{hashed_files} files hashed ({hashed_bytes / 1024 ** 2:.1f} MB), {failed} mods failed, "
+          f"{time.perf_counter() - started:.2f} s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def command_conflicts(args) -> int:
+    """ Indexes files of the mods, prints which mods override files of which (the mod loaded later wins),
+        every conflicting file with --files """
+    if args.mod and not args.game:
+        raise CliError("--mod needs --game")
+    started = time.perf_counter()
+    files = conflicts = failed = 0
+    for game in open_games(args.database, args.game):
+        mod = None
+        if args.mod:
+            mod = next((found for found in game.mods if found.title == args.mod or str(found.mod_id) == args.mod), None)
+            if mod is None:
+                raise CliError(f"No mod '{args.mod}' in {game.title}")
+        not_indexed = game.index_files()
+        failed += len(not_indexed)
+        for title in not_indexed:
+            print(f"Not indexed: {title}", file=sys.stderr)
+        rank = game.load_order_rank()
+        found = game.conflict_index.conflicts(rank, mod)
+        files += game.conflict_index.file_count()
+        conflicts += len(found)
+        if args.files:
+            for conflict in found:
+                print(f"{game.title}\t{conflict.path}\t{conflict.winner.title}\toverrides "
+                      + ", ".join(overridden.title for overridden in conflict.overridden))
+            continue
+        pairs = game.conflict_index.overrides(rank, mod)
+        for (winner, overridden), count in sorted(pairs.items(), key=lambda item: (-item[1], item[0][0].title)):
+            print(f"{game.title}\t{winner.title}\toverrides\t{overridden.title}\t{count} files")
+    print(f"{files} files, {conflicts} provided by several mods, {failed} mods not indexed, "
+          f"{time.perf_counter() - started:.2f} s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="mmt", description="Mod Manager Tool without GUI")
+    parser.add_argument("--database", help="database file (the first app database of the current folder by default)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    games = commands.add_parser("games", help="list games")
+    games.set_defaults(run=command_games)
+
+    mods = commands.add_parser("list", help="list mods")
+    mods.add_argument("--game", default="", help="game title or id (all games by default)")
+    mods.add_argument("--tags", default="", help="tag query, e.g. 'Map AND NOT Graphics'")
+    mods.add_argument("--search", default="", help="full-text search in title, tags and commentary")
+    mods.add_argument("--game-version", default="", help="mods that support the game version, e.g. 1.9.3 or 1.9.*")
+    mods.add_argument("--json", action="store_true", help="one json object per line")
+    mods.set_defaults(run=command_list)
+
+    scan = commands.add_parser("scan", help="parse mods of folders (library_roots of config.txt by default)")
+    scan.add_argument("folders", nargs="*")
+    scan.add_argument("--depth", type=int, default=None, help="levels of subfolders to walk (scan_depth of config.txt, 2 by default)")
+    scan.add_argument("--ignore", action="append", metavar="PATTERN", help="skip files and folders with names like this, e.g. '*_old', can be repeated")
+    scan.add_argument("--save", metavar="GAME", default="", help="add new mods to this game (title or id)")
+    scan.add_argument("--jobs", type=int, default=None, help="number of parsing threads")
+    scan.set_defaults(run=command_scan)
+
+    remap_help = "replace the path prefix OLD by NEW in filepath and image_path, can be repeated"
+    export = commands.add_parser("export", help="write mods as json lines or csv")
+    export.add_argument("--game", default="", help="game title or id (all games by default)")
+    export.add_argument("--format", choices=("json", "csv"), help="json lines by default, csv for a .csv output")
+    export.add_argument("--output", help="file (standard output by default)")
+    export.add_argument("--remap", action="append", metavar="OLD=NEW", help=remap_help)
+    export.set_defaults(run=command_export)
+
+    import_ = commands.add_parser("import", help="add mods of a json lines or csv file made by export")
+    import_.add_argument("file")
+    import_.add_argument("--game", default="", help="add all mods to this game (the game of every row by default)")
+    import_.add_argument("--format", choices=("json", "csv"), help="by the file extension, json lines by default")
+    import_.add_argument("--remap", action="append", metavar="OLD=NEW", help=remap_help)
+    import_.add_argument("--chunk", type=int, default=IMPORT_CHUNK, help="rows per transaction")
+    import_.set_defaults(run=command_import, output=None)
+
+    check = commands.add_parser("check", help="find missing requirements, cycles, incompatible mods and missing folders")
+    check.add_argument("--game", default="", help="game title or id (all games by default)")
+    check.add_argument("--load-order", action="store_true", help="print load order of every game")
+    check.set_defaults(run=command_check)
+
+    fingerprint = commands.add_parser("fingerprint", help="find mods whose files have changed since they were saved and copies of mods")
+    fingerprint.add_argument("--game", default="", help="game title or id (all games by default)")
+    fingerprint.add_argument("--jobs", type=int, default=None, help="number of hashing threads")
+    fingerprint.add_argument("--save", action="store_true", help="save the changed mods, their files become the saved ones")
+    fingerprint.add_argument("--json", action="store_true", help="one json object per fingerprinted mod")
+    fingerprint.set_defaults(run=command_fingerprint)
+
+    conflicts = commands.add_parser("conflicts", help="find files that several mods have and which mod overrides which")
+    conflicts.add_argument("--game", default="", help="game title or id (all games by default)")
+    conflicts.add_argument("--mod", default="", help="only conflicts of this mod (title or id)")
+    conflicts.add_argument("--files", action="store_true", help="print every conflicting file")
+    conflicts.set_defaults(run=command_conflicts)
+    return parser
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.database is None:
+        args.database = find_database()
+    try:
+        if not args.database or not path.isfile(args.database):
+            raise CliError("No app database found, use --database")
+        return args.run(args)
+    except CliError as error:
+        print(error, file=sys.stderr)
+        return 2
+    finally:
+        close_databases()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
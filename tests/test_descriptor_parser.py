@@ -0,0 +1,41 @@
+from DescriptorParser import parse, read_descriptor_stream
+
+
+def test_windows_path_keeps_backslashes():
+    descriptor = read_descriptor_stream(['name="Mod"\n', 'path="D:\\Games\\Stellaris\\mod\\ugc_1"\n'])
+    assert descriptor.path == "D:\\Games\\Stellaris\\mod\\ugc_1"
+
+
+def test_escaped_quote_and_backslash():
+    descriptor = read_descriptor_stream(['name="A \\"quoted\\" mod"\n', 'path="C:\\\\mods\\\\a"\n'])
+    assert descriptor.name == 'A "quoted" mod'
+    assert descriptor.path == "C:\\mods\\a"
+
+
+def test_token_split_between_chunks():
+    chunks = ['name="Split ', 'mod"\nver', 'sion = "1.', '2"\ntags = { "Game', 'play" "Map" }\n']
+    descriptor = read_descriptor_stream(chunks)
+    assert descriptor.name == "Split mod"
+    assert descriptor.version == "1.2"
+    assert descriptor.tags == ("Gameplay", "Map")
+
+
+def test_multi_line_string():
+    descriptor = read_descriptor_stream(['name="First line\nsecond line"\n', 'version="3"\n'])
+    assert descriptor.name == "First line\nsecond line"
+    assert descriptor.version == "3"
+
+
+def test_nested_blocks():
+    data = parse(['name = "Mod" # comment\n', 'dependencies = { "A" { nested = { deep = yes } } "B" }\n'])
+    assert data["name"] == "Mod"
+    assert data["dependencies"] == ["A", {"nested": {"deep": "yes"}}, "B"]
+    descriptor = read_descriptor_stream(['tags = { "a" "b" }\n', 'tags = { "c" }\n'])
+    assert descriptor.tags == ("a", "b", "c")
+
+
+def test_malformed_input():
+    assert parse(['} name = "Stray brace"\n']) == {"name": "Stray brace"}
+    assert parse(['tags = { "a" "b"\n', 'name = "Unclosed block"\n']) == {"tags": {"name": "Unclosed block"}}
+    assert parse(['name = "Unclosed string\n']) == {"name": "Unclosed string\n"}
+    assert parse(['= = {\n']) == {}
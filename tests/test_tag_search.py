@@ -0,0 +1,23 @@
+from Database import Database, migrate, search_tags, write_tags
+
+
+def test_tags_match_casefolded(tmp_path):
+    database_name = str(tmp_path / "tags.sqlite")
+    con = Database(database_name).connection()
+    with con:
+        game_id = con.execute("INSERT INTO Games(Game_title) VALUES('Game')").lastrowid
+        con.executemany("INSERT INTO Mods(Mod_ID, Game_ID, Title, Filepath) VALUES(?, ?, ?, '')",
+                        [(1, game_id, "Alpha"), (2, game_id, "Beta")])
+        con.executemany("INSERT INTO ModTags(Mod_ID, Tag) VALUES(?, ?)", [(1, "Map"), (1, "MAP"), (2, "STRASSE")])
+        con.execute("PRAGMA user_version = 6")  # rows written before the tags were casefolded
+    con.close()
+
+    con = Database(database_name).connection()
+    assert con.execute("SELECT Mod_ID, Tag FROM ModTags ORDER BY Mod_ID").fetchall() == [(1, "map"), (2, "strasse")]
+    with con:
+        write_tags(con, [(1, ["Straße", "Ärger"])])
+    assert con.execute("SELECT Tag FROM ModTags WHERE Mod_ID = 1 ORDER BY Tag").fetchall() == [("strasse",), ("ärger",)]
+    assert sorted(search_tags(con, game_id, "STRASSE")) == [1, 2]
+    assert search_tags(con, game_id, "ÄRGER AND NOT strasse") == []
+    assert migrate(con) == 0
+    con.close()
@@ -0,0 +1,74 @@
+import os
+import shutil
+import sqlite3
+import sys
+from os import path
+import pytest
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # no window is shown, it runs without a display
+GAME_TITLE = "Red Dead Redemption 2"  # a game of the sample database without mods
+
+
+def write_descriptor(folder: str, version: str) -> None:
+    with open(path.join(folder, "descriptor.mod"), "w", encoding="utf-8") as descriptor_file:
+        descriptor_file.write(f'name="Alpha"\nversion="{version}"\ntags={{\n\t"Gameplay"\n}}\nsupported_version="1.9.*"\n')
+
+
+def saved_version(database_name: str, title: str) -> str:
+    con = sqlite3.connect(database_name)
+    try:
+        return con.execute("SELECT Mversion FROM Mods WHERE Title = ?", (title,)).fetchone()[0]
+    finally:
+        con.close()
+
+
+@pytest.fixture(scope="module")
+def window(tmp_path_factory):
+    """ Main window on a copy of the sample database, the app reads its files from the current folder """
+    work_folder = str(tmp_path_factory.mktemp("work"))
+    for file in ("MMT.ui", "localization.json", "MMT_workbase.sqlite"):
+        shutil.copy(path.join(ROOT, file), work_folder)
+    with open(path.join(work_folder, "config.txt"), "w") as config_file:
+        config_file.write("lang = EN")
+    old_folder = os.getcwd()
+    os.chdir(work_folder)
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    import ModManagerTool
+    ModManagerTool.app = app  # the module expects the application of its __main__ block
+    main_window = ModManagerTool.MainWindow(("MMT_workbase.sqlite", 0))
+    main_window.show()
+    yield app, main_window
+    main_window.close()
+    os.chdir(old_folder)
+
+
+def test_changed_descriptor_survives_update_and_save(window):
+    app, main_window = window
+    game = [game for game in main_window.games if game.title == GAME_TITLE][0]
+    game.button.click()
+    app.processEvents()
+    os.makedirs("alpha", exist_ok=True)
+    write_descriptor("alpha", "1")
+    main_window.add_mod_with_info(path.abspath("alpha/descriptor.mod"))
+    app.processEvents()
+    main_window.save_all()
+    app.processEvents()
+    record = [mod for mod in main_window.chosen_game.mods if mod.title == "Alpha"][0]
+    assert main_window.modsView.bound_editors  # the mod has a live widget, it must not write its old text back
+    assert saved_version("MMT_workbase.sqlite", "Alpha") == "1"
+
+    write_descriptor("alpha", "2")
+    main_window.update_all()
+    app.processEvents()
+    assert record.mod_version == "2"
+    assert saved_version("MMT_workbase.sqlite", "Alpha") == "2"
+
+    main_window.save_all()
+    assert saved_version("MMT_workbase.sqlite", "Alpha") == "2"
+
+    main_window.update_all()  # the manifest skips the unchanged descriptor, the record keeps the new data
+    app.processEvents()
+    assert record.mod_version == "2"
+    assert saved_version("MMT_workbase.sqlite", "Alpha") == "2"